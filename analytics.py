@@ -0,0 +1,159 @@
+"""Batch handicap analytics over a posted-differential history.
+
+Computes, for every posted round at once, the rolling index (best 8 of the
+last 20, or the mean when fewer than 8), the anti-index (worst 8 of the
+last 20), a trailing SMA and yearly means. Uses NumPy when it is
+installed and a pure-Python path otherwise. Both work in integer tenths
+(differentials are stored to one decimal) and round exact halves the way
+HandicapEngine does, so either agrees with /api/handicap.
+
+    python3 analytics.py [whatif_diff ...]   # summary, plus projected index
+"""
+import sys
+from collections import defaultdict
+
+try:
+    import numpy as np   # optional: pip install numpy
+except ImportError:
+    np = None
+
+BACKEND = 'numpy' if np else 'python'
+WINDOW, BEST = 20, 8
+
+
+def _tenths(posted):
+    return [int(round(r['differential'] * 10)) for r in posted]
+
+
+def _half_way(s, k):
+    return s % k != 0 and (2 * s) % k == 0
+
+
+def _float_mean(xs):
+    """Tenths of round(mean, 1) taken over the float values, as server.window_index does —
+    on an exact half the float sum decides which way it goes."""
+    return round(round(sum(x / 10 for x in xs) / len(xs), 1) * 10)
+
+
+def _mean_tenths(xs):
+    s, k = sum(xs), len(xs)
+    return _float_mean(xs) if _half_way(s, k) else round(s / k)
+
+
+def _rolling_py(d):
+    index, anti = [], []
+    for i in range(len(d)):
+        w = sorted(d[max(0, i - WINDOW + 1):i + 1])
+        index.append(_mean_tenths(w[:BEST]))
+        anti.append(_mean_tenths(w[-BEST:]) if len(w) >= BEST else None)
+    return index, anti
+
+
+def _rolling_np(d):
+    n = len(d)
+    a = np.asarray(d, dtype=np.int64)
+    # pad the front so the first 19 rounds get a window too; padding sorts last
+    big = np.iinfo(np.int64).max // (WINDOW * 2)
+    w = np.lib.stride_tricks.sliding_window_view(
+        np.concatenate([np.full(WINDOW - 1, big, dtype=np.int64), a]), WINDOW)
+    w = np.sort(w, axis=1)
+    cs = np.concatenate([np.zeros((n, 1), dtype=np.int64), np.cumsum(w, axis=1)], axis=1)
+    rows = np.arange(n)
+    count = np.minimum(rows + 1, WINDOW)
+    k = np.minimum(count, BEST)
+    best = cs[rows, k]
+    worst = cs[rows, count] - cs[rows, np.maximum(count - BEST, 0)]
+    index = np.rint(best / k).astype(np.int64).tolist()
+    anti = np.rint(worst / BEST).astype(np.int64).tolist()
+    # exact halves are rare; settle them the way the float engine does
+    for i in np.nonzero((best % k != 0) & ((2 * best) % k == 0))[0].tolist():
+        index[i] = _float_mean(w[i, :k[i]].tolist())
+    for i in np.nonzero((count >= BEST) & (worst % BEST != 0) & ((2 * worst) % BEST == 0))[0].tolist():
+        anti[i] = _float_mean(w[i, count[i] - BEST:count[i]].tolist())
+    return index, [x if c >= BEST else None for x, c in zip(anti, count.tolist())]
+
+
+def _sma(d, n):
+    if np:
+        c = np.concatenate([[0], np.cumsum(np.asarray(d, dtype=np.int64))])
+        s = ((c[n:] - c[:-n]) / n).tolist() if len(d) >= n else []
+    else:
+        s, run = [], sum(d[:n - 1])
+        for i in range(n - 1, len(d)):
+            run += d[i]
+            s.append(run / n)
+            run -= d[i - n + 1]
+    return [None] * min(n - 1, len(d)) + s
+
+
+def lttb(ys, n):
+    """Largest-Triangle-Three-Buckets: indices of `n` points of `ys` that keep its shape.
+
+    x is the position (charts plot these as evenly spaced labels). Returns
+    (indices, buckets) where buckets[k] is the (start, end) range point k
+    stands for, so callers can report min/max envelopes per point.
+    """
+    size = len(ys)
+    if n >= size or n < 3:
+        return list(range(size)), [(i, i + 1) for i in range(size)]
+    every = (size - 2) / (n - 2)
+    picked, buckets, a = [0], [(0, 1)], 0
+    for i in range(n - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        nxt = ys[end:min(int((i + 2) * every) + 1, size)]
+        avg_x = end + (len(nxt) - 1) / 2
+        avg_y = sum(nxt) / len(nxt)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (ys[j] - ys[a]) - (a - j) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        buckets.append((start, end))
+        a = best
+    picked.append(size - 1)
+    buckets.append((size - 1, size))
+    return picked, buckets
+
+
+def analyze(posted, sma_n=5):
+    """Series for `posted` — rounds with 'date' and 'differential', in date order."""
+    d = _tenths(posted)
+    index, anti = (_rolling_np if np else _rolling_py)(d) if d else ([], [])
+    sma = _sma(d, sma_n)
+    by_year = defaultdict(list)
+    for r, x in zip(posted, d):
+        by_year[str(r['date'])[:4]].append(x)
+    return {
+        'backend': BACKEND,
+        'series': [{'date': r['date'], 'differential': r['differential'],
+                    'index_after': i / 10,
+                    'anti_index': a / 10 if a is not None else None,
+                    'sma': round(s / 10, 2) if s is not None else None}
+                   for r, i, a, s in zip(posted, index, anti, sma)],
+        'yearly_avgs': [{'year': y, 'avg': _mean_tenths(xs) / 10}
+                        for y, xs in sorted(by_year.items())],
+    }
+
+
+def what_if(posted, diffs, sma_n=5):
+    """The index after posting hypothetical differentials on top of `posted`."""
+    extra = [{'date': 'what-if', 'differential': x} for x in diffs]
+    series = analyze(list(posted) + extra, sma_n)['series']
+    return {'index': series[-1]['index_after'] if series else None,
+            'anti_index': series[-1]['anti_index'] if series else None,
+            'steps': [s['index_after'] for s in series[len(posted):]]}
+
+
+if __name__ == '__main__':
+    import time, server
+    server.get_handicap_data()
+    posted = server.HANDICAP.posted
+    t = time.perf_counter()
+    res = analyze(posted)
+    ms = (time.perf_counter() - t) * 1000
+    last = res['series'][-1] if res['series'] else {}
+    print(f"{len(posted)} posted rounds, {BACKEND} backend, {ms:.1f} ms")
+    print(f"index {last.get('index_after')}  anti {last.get('anti_index')}  sma {last.get('sma')}")
+    if sys.argv[1:]:
+        print('what-if', what_if(posted, [float(x) for x in sys.argv[1:]]))
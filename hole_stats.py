@@ -0,0 +1,109 @@
+"""Per-hole results index — columns of every recorded hole, keyed by (course, hole).
+
+Derived from the hole_results nested in each round so hole-level questions
+(average on Lakes #8, double-bogey rate by handicap rank) don't walk every
+round. Governors Club combos share one key space: their hole numbers
+(1–27 across Lakes/Foothills/Mountain) are unique, so Lakes #8 is the same
+hole whichever nine it was played with.
+"""
+from collections import defaultdict
+
+COLUMNS = ('round_id', 'date', 'par', 'handicap', 'gross', 'adj',
+           'strokes_received', 'v_net', 'd_net')
+
+
+def hole_course(course_id):
+    return 'gov' if (course_id or '').startswith('gov-') else course_id
+
+
+def _avg(xs):
+    xs = [x for x in xs if x is not None]
+    return round(sum(xs) / len(xs), 2) if xs else None
+
+
+def summarize(cols):
+    """Stats for one column set (a hole, or several holes pooled)."""
+    n = len(cols['gross'])
+    to_par = [g - p for g, p in zip(cols['gross'], cols['par']) if g is not None and p]
+    dist = {'birdie_or_better': 0, 'par': 0, 'bogey': 0, 'double_plus': 0}
+    for d in to_par:
+        dist['birdie_or_better' if d < 0 else 'par' if d == 0 else 'bogey' if d == 1 else 'double_plus'] += 1
+    vd = [i for i, v in enumerate(cols['v_net']) if v is not None]
+    return {
+        'n': n,
+        'avg_gross': _avg(cols['gross']), 'avg_adj': _avg(cols['adj']), 'avg_to_par': _avg(to_par),
+        'rates': {k: round(c / len(to_par), 3) for k, c in dist.items()} if to_par else None,
+        'strokes_received': sum(s or 0 for s in cols['strokes_received']),
+        'vd': {'n': len(vd), 'avg_v_net': _avg(cols['v_net'][i] for i in vd),
+               'avg_d_net': _avg(cols['d_net'][i] for i in vd)} if vd else None,
+    }
+
+
+class HoleIndex:
+    """Columnar per-hole index over ROUNDS, mirrored from its journal ops.
+
+    Adding a round appends to each of its holes' columns; removing one
+    drops its rows from the columns it touched (tracked in `keys_of`).
+    """
+    def __init__(self, rounds=()):
+        self.version = None     # ROUNDS.version this state reflects
+        self.rebuild(rounds)
+
+    def rebuild(self, rounds):
+        self.cols    = {}
+        self.keys_of = defaultdict(set)
+        for r in rounds:
+            self.add(r)
+
+    def add(self, r):
+        course = hole_course(r.get('course_id'))
+        for h in r.get('hole_results') or ():
+            key = (course, h.get('holeNumber'))
+            cols = self.cols.get(key)
+            if cols is None:
+                cols = self.cols[key] = {c: [] for c in COLUMNS}
+            vd = h.get('vd') or {}
+            row = (r['id'], r.get('date'), h.get('par'), h.get('handicap'), h.get('gross'),
+                   h.get('adj'), h.get('strokes_received'), vd.get('vNet'), vd.get('dNet'))
+            for c, v in zip(COLUMNS, row):
+                cols[c].append(v)
+            self.keys_of[r['id']].add(key)
+
+    def remove(self, round_id):
+        for key in self.keys_of.pop(round_id, ()):
+            cols = self.cols[key]
+            keep = [i for i, rid in enumerate(cols['round_id']) if rid != round_id]
+            if not keep:
+                del self.cols[key]
+                continue
+            for c in COLUMNS:
+                col = cols[c]
+                cols[c] = [col[i] for i in keep]
+
+    def apply(self, op):
+        """Mirror one ROUNDS journal op."""
+        if op['op'] != 'add':
+            self.remove(op['at'])
+        if op['op'] != 'del':
+            self.add(op['rec'])
+
+    def stats(self, course_id=None, hole=None, group=None):
+        """Per-hole stats, optionally filtered; group='handicap' pools holes by handicap rank."""
+        course = hole_course(course_id) if course_id else None
+        keys = sorted((k for k in self.cols
+                       if (course is None or k[0] == course) and (hole is None or k[1] == hole)),
+                      key=lambda k: (str(k[0]), k[1] or 0))
+        if group == 'handicap':
+            pooled = defaultdict(lambda: {c: [] for c in COLUMNS})
+            for k in keys:
+                for i, hcp in enumerate(self.cols[k]['handicap']):
+                    for c in COLUMNS:
+                        pooled[hcp][c].append(self.cols[k][c][i])
+            return {'by_handicap': [{'handicap': h, **summarize(pooled[h])}
+                                    for h in sorted(pooled, key=lambda h: (h is None, h or 0))]}
+        holes = []
+        for k in keys:
+            cols = self.cols[k]
+            holes.append({'course_id': k[0], 'hole': k[1], 'par': cols['par'][-1],
+                          'handicap': cols['handicap'][-1], **summarize(cols)})
+        return {'holes': holes}
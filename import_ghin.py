@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 """
-Import GHIN CSV into ghin_rounds.json.
-Run: python3 import_ghin.py
+Merge a GHIN CSV export into ghin_rounds.json (server stopped).
+Run: python3 import_ghin.py [csv_path] [--dry-run]
+
+Rows are read lazily and matched to existing rounds by
+(date, course_id, adj_score). Matched rounds keep their id, hole_results,
+vd_match and include_ghin; only GHIN fields that changed are patched.
+Unmatched rows are appended with the next free id, so re-importing the
+same export is a no-op.
 """
-import csv, json, os, re
+import csv, os, re, sys
+from datetime import datetime
 
 CSV_PATH = os.path.expanduser('~/Downloads/Golf Handicap Calculator - GHIN.1.csv')
-OUT_PATH  = os.path.join(os.path.dirname(__file__), 'ghin_rounds.json')
 
 # Course name → canonical ID (normalize "Gov X" and "X" variants to same ID)
 NAME_TO_ID = {
@@ -32,6 +38,14 @@ NAME_TO_ID = {
     'the ridge':                      'the-ridge',
     'new smyrna golf club':           'new-smyrna-golf-club',
     'gov foothills to foothills':     'gov-foothills-foothills',
+    # names the app saves Governors Club rounds under
+    'gc lakes to foothills':          'gov-lakes-foothills',
+    'gc lakes to foothills blue':     'gov-lakes-foothills-blue',
+    'gc foothills to mountain':       'gov-foothills-mountain',
+    'gc mountain to lakes':           'gov-mountain-lakes',
+    'gc foothills, foothills':        'gov-foothills-foothills',
+    'gc mountain, mountain':          'gov-mountain-mountain',
+    'gc lakes, lakes':                'gov-lakes-lakes',
 }
 
 SKIP_ROUNDS = {109}  # duplicate
@@ -40,6 +54,13 @@ def course_id(name):
     key = name.strip().lower()
     return NAME_TO_ID.get(key, re.sub(r'[^a-z0-9]+', '-', key).strip('-'))
 
+def iso_date(s):
+    # store dates as YYYY-MM-DD, matching what server.py writes
+    for fmt in ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y'):
+        try: return datetime.strptime(s, fmt).date().isoformat()
+        except ValueError: pass
+    return s
+
 def safe_float(s):
     try: return float(s)
     except: return None
@@ -48,64 +69,98 @@ def safe_int(s):
     try: return int(s)
     except: return None
 
-rounds = []
-rid = 0
-
-with open(CSV_PATH, newline='', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    for row in reader:
-        # skip rows where col 0 is not a positive integer (headers, summary rows)
-        if not row or not row[0].strip().isdigit():
-            continue
-        round_num = int(row[0])
-        if round_num in SKIP_ROUNDS:
-            continue
-
-        date       = row[1].strip() if len(row) > 1 else ''
-        course_name = row[2].strip() if len(row) > 2 else ''
-        rating     = safe_float(row[3]) if len(row) > 3 else None
-        slope      = safe_int(row[4])   if len(row) > 4 else None
-        # col 5: PCC (ignored)
-        score      = safe_int(row[6])   if len(row) > 6 else None
-        adj_score  = safe_int(row[7])   if len(row) > 7 else None
-        course_hdcp = safe_int(row[8])  if len(row) > 8 else None
-        # col 9: net score (ignored)
-        diff       = safe_float(row[10]) if len(row) > 10 else None
-        hdcp_index = safe_float(row[11]) if len(row) > 11 else None
-        ghin_val   = safe_float(row[12]) if len(row) > 12 else None
-        # col 13: GHIN Year (ignored)
-        anti_index = safe_float(row[14]) if len(row) > 14 else None
-        # col 15: Ave Diff 20 (ignored — we recompute)
-        # col 16: VD (match column — handled by vd_matches.json)
-
-        # Skip rounds with no adj score (incomplete rounds)
-        if adj_score is None:
-            continue
-
-        nine_hole = adj_score < 60
-        par = 36 if nine_hole else 72
-
-        rid += 1
-        rounds.append({
-            'id':           rid,
-            'date':         date,
-            'course_id':    course_id(course_name),
-            'course_name':  course_name,
-            'rating':       rating,
-            'slope':        slope,
-            'par':          par,
-            'score':        score,
-            'adj_score':    adj_score,
-            'course_hdcp':  course_hdcp,
-            'differential': diff,
-            'ghin_manual':  ghin_val,
-            'include_ghin': True,
-            'nine_hole':    nine_hole,
-            'hole_results': [],
-            'vd_match':     None,
-        })
-
-with open(OUT_PATH, 'w') as f:
-    json.dump(rounds, f, indent=2)
-
-print(f'Imported {len(rounds)} rounds → {OUT_PATH}')
+# fields a GHIN row owns; everything else on a round belongs to the app. par and
+# nine_hole are guessed from adj_score and the app names courses its own way
+# ("GC …"), so those only fill in rounds the import creates.
+GHIN_FIELDS = ('rating', 'slope', 'score', 'course_hdcp', 'differential', 'ghin_manual')
+
+def merge_key(r):
+    return (r.get('date'), r.get('course_id'), r.get('adj_score'))
+
+def read_rows(path):
+    """Yield one round dict (without id) per usable CSV row."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            # skip rows where col 0 is not a positive integer (headers, summary rows)
+            if not row or not row[0].strip().isdigit():
+                continue
+            if int(row[0]) in SKIP_ROUNDS:
+                continue
+
+            date       = iso_date(row[1].strip()) if len(row) > 1 else ''
+            course_name = row[2].strip() if len(row) > 2 else ''
+            rating     = safe_float(row[3]) if len(row) > 3 else None
+            slope      = safe_int(row[4])   if len(row) > 4 else None
+            # col 5: PCC (ignored)
+            score      = safe_int(row[6])   if len(row) > 6 else None
+            adj_score  = safe_int(row[7])   if len(row) > 7 else None
+            course_hdcp = safe_int(row[8])  if len(row) > 8 else None
+            # col 9: net score (ignored)
+            diff       = safe_float(row[10]) if len(row) > 10 else None
+            # col 11: handicap index, 13: GHIN year, 14: anti index (ignored — we recompute)
+            ghin_val   = safe_float(row[12]) if len(row) > 12 else None
+            # col 15: Ave Diff 20 (ignored — we recompute)
+            # col 16: VD (match column — handled by vd_matches.json)
+
+            # Skip rounds with no adj score (incomplete rounds)
+            if adj_score is None:
+                continue
+
+            nine_hole = adj_score < 60
+            yield {
+                'date':         date,
+                'course_id':    course_id(course_name),
+                'course_name':  course_name,
+                'rating':       rating,
+                'slope':        slope,
+                'par':          36 if nine_hole else 72,
+                'score':        score,
+                'adj_score':    adj_score,
+                'course_hdcp':  course_hdcp,
+                'differential': diff,
+                'ghin_manual':  ghin_val,
+                'include_ghin': True,
+                'nine_hole':    nine_hole,
+                'hole_results': [],
+                'vd_match':     None,
+            }
+
+def merge(store, rows, dry_run=False):
+    """Journal an add or set op for each new or changed row; returns the counts."""
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    with store.lock:
+        existing = store.get()
+        by_key = {}
+        for r in existing:
+            by_key.setdefault(merge_key(r), []).append(r)
+        next_id = max((r['id'] for r in existing), default=0) + 1
+        ops = []
+        for row in rows:
+            # each row claims one existing round, so repeated keys pair off in order
+            match = by_key.get(merge_key(row))
+            if match:
+                r = match.pop(0)
+                changed = {k: row[k] for k in GHIN_FIELDS if r.get(k) != row[k]}
+                if not changed:
+                    counts['skipped'] += 1
+                    continue
+                ops.append({'op': 'set', 'at': r['id'], 'rec': {**r, **changed}})
+                counts['updated'] += 1
+            else:
+                ops.append({'op': 'add', 'rec': {'id': next_id, **row}})
+                next_id += 1
+                counts['inserted'] += 1
+        if not dry_run:
+            store.mutate_many(ops)
+            store.compact()
+    return counts
+
+
+if __name__ == '__main__':
+    import server
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    dry  = '--dry-run' in sys.argv[1:]
+    path = args[0] if args else CSV_PATH
+    c = merge(server.ROUNDS, read_rows(path), dry)
+    print(f"{'Would merge' if dry else 'Merged'} {path} → {server.ROUNDS.path}: "
+          f"{c['inserted']} inserted, {c['updated']} updated, {c['skipped']} unchanged")
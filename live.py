@@ -0,0 +1,175 @@
+"""Live VD matches — the recording phone pushes holes, spectators follow over SSE.
+
+Subscribers don't hold a worker thread: the request handler hands its
+socket to the Broadcaster, whose single thread writes each event (encoded
+once) to every subscriber and sends a heartbeat comment when idle so dead
+connections get noticed and dropped.
+"""
+import itertools, json, queue, threading, time
+
+import vd_scoring
+
+HEARTBEAT    = 15     # seconds between keep-alive comments on an idle stream
+SEND_TIMEOUT = 2      # a subscriber that can't take a frame this fast is dropped
+MAX_SUBSCRIBERS = 500
+STALE_AFTER  = 6 * 3600   # a match nobody ended is dropped after this long idle
+
+
+def sse_frame(event, data, seq=None):
+    head = f'id: {seq}\n' if seq is not None else ''
+    return f'{head}event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+class Broadcaster:
+    """Fan-out of SSE frames to detached sockets from one writer thread.
+
+    Everything goes through one queue, so a new subscriber's first frame is
+    written before any event published after it subscribed.
+    """
+    def __init__(self):
+        self.lock   = threading.Lock()
+        self.subs   = {}              # socket → match id it follows (None = all)
+        self.count  = 0               # subscribers, including ones still queued
+        self.queue  = queue.Queue()
+        self.thread = None
+
+    def full(self):
+        return self.count >= MAX_SUBSCRIBERS
+
+    def subscribe(self, sock, first, match_id=None):
+        """Take over `sock` (response headers already sent); False if we're full."""
+        with self.lock:
+            if self.count >= MAX_SUBSCRIBERS:
+                return False
+            self.count += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='sse', daemon=True)
+                self.thread.start()
+        sock.settimeout(SEND_TIMEOUT)
+        self.queue.put(('sub', sock, match_id, first))
+        return True
+
+    def publish(self, frame, match_id=None):
+        self.queue.put(('pub', None, match_id, frame))
+
+    def _send(self, sock, frame):
+        try:
+            sock.sendall(frame)
+            return True
+        except OSError:
+            with self.lock:
+                self.subs.pop(sock, None)
+                self.count -= 1
+            try:
+                sock.close()
+            except OSError:
+                pass
+            return False
+
+    def _run(self):
+        while True:
+            try:
+                kind, sock, match_id, frame = self.queue.get(timeout=HEARTBEAT)
+            except queue.Empty:
+                kind, sock, match_id, frame = 'pub', None, None, b': ping\n\n'
+            if kind == 'sub':
+                with self.lock:
+                    self.subs[sock] = match_id
+                self._send(sock, frame)
+                continue
+            with self.lock:
+                socks = [s for s, mid in self.subs.items()
+                         if mid is None or match_id is None or mid == match_id]
+            for s in socks:
+                self._send(s, frame)
+
+
+class LiveMatches:
+    """Matches in progress, scored with vd_scoring as holes arrive."""
+    def __init__(self, broadcaster):
+        self.lock    = threading.RLock()
+        self.bc      = broadcaster
+        self.matches = {}
+        self._ids    = itertools.count(1)
+        self._seq    = itertools.count(1)
+
+    def _score(self, m):
+        v, d = vd_scoring.match_score(m['holes'])
+        margin = vd_scoring.margin(m['holes'], m['start_offset'])
+        return {'id': m['id'], 'thru': len(m['holes']), 'v_net': v, 'd_net': d, 'margin': margin,
+                'leader': 'V' if margin > 0 else 'D' if margin < 0 else 'T',
+                'honor': vd_scoring.honor(m['holes'], m['initial_honor'])}
+
+    def _publish(self, event, data, match_id):
+        self.bc.publish(sse_frame(event, data, next(self._seq)), match_id)
+
+    def start(self, body):
+        if not isinstance(body, dict):
+            raise ValueError('match must be an object')
+        if not isinstance(body.get('date'), (str, type(None))):
+            raise ValueError('date must be a string')
+        nines = body.get('nines') or []
+        if not isinstance(nines, list) or not all(isinstance(n, str) for n in nines):
+            raise ValueError('nines must be a list of names')
+        offset = body.get('start_offset') or 0
+        if isinstance(offset, bool) or not isinstance(offset, int):
+            raise ValueError('start_offset must be an integer')
+        if body.get('initial_honor') not in (None, 'V', 'D'):
+            raise ValueError("initial_honor must be 'V' or 'D'")
+        with self.lock:
+            now = time.time()
+            for k in [k for k, m in self.matches.items() if now - m['updated'] > STALE_AFTER]:
+                del self.matches[k]
+            mid = str(next(self._ids))
+            m = self.matches[mid] = {
+                'id': mid, 'date': body.get('date'), 'nines': nines,
+                'start_offset': offset,
+                'initial_honor': body.get('initial_honor') or 'D',
+                'holes': [], 'updated': now,
+            }
+            self._publish('start', self._state(m), mid)
+            return mid
+
+    def hole(self, mid, h):
+        """Record (or correct, when h['idx'] is an earlier hole) one VD hole result."""
+        with self.lock:
+            m = self.matches.get(mid)
+            if m is None:
+                return None
+            vd = h.get('vd') or {}
+            if not isinstance(h.get('par'), int) or not all(
+                    isinstance(vd.get(k), int) for k in ('vGross', 'dGross', 'vNet', 'dNet')):
+                raise ValueError('hole needs par and vd.vGross, dGross, vNet and dNet')
+            idx = h.pop('idx', len(m['holes']))
+            if not isinstance(idx, int) or not 0 <= idx <= len(m['holes']):
+                raise ValueError('idx must point at a recorded hole or the next one')
+            del m['holes'][idx:]
+            m['holes'].append(h)
+            m['updated'] = time.time()
+            score = self._score(m)
+            self._publish('hole', {**score, 'idx': idx, 'hole': h}, mid)
+            return score
+
+    def end(self, mid):
+        with self.lock:
+            m = self.matches.pop(mid, None)
+            if m is not None:
+                self._publish('end', self._score(m), mid)
+            return m is not None
+
+    def _state(self, m):
+        return {**self._score(m), 'date': m['date'], 'nines': m['nines'],
+                'start_offset': m['start_offset'], 'holes': list(m['holes'])}
+
+    def snapshot(self, mid=None):
+        with self.lock:
+            return [self._state(m) for k, m in self.matches.items() if mid is None or k == mid]
+
+    def subscribe(self, sock, mid=None):
+        """Hand `sock` to the broadcaster, starting with every match it follows in full.
+
+        Taken under the lock so no hole lands between the snapshot and the stream.
+        """
+        with self.lock:
+            first = b'retry: 5000\n' + sse_frame('state', {'matches': self.snapshot(mid)})
+            return self.bc.subscribe(sock, first, mid)
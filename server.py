@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
 """Golf Log — personal golf tracking PWA + VD match scoring"""
 
-import json, os, math, base64, re
-from collections import defaultdict
+import json, os, math, base64, re, threading, hashlib, gzip, signal, selectors, socket, time, uuid
+import functools, sys, traceback
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+import urllib.request
+
+from standings import Standings
+import analytics, vd_scoring
+from live import Broadcaster, LiveMatches
+from hole_stats import HoleIndex
+
+try:
+    import brotli   # optional: pip install brotli
+except ImportError:
+    brotli = None
 
 # Golf flag icon (180×180 PNG — dark green background, white flag, PIL-generated)
 ICON_PNG = base64.b64decode(
@@ -27,9 +42,15 @@ ICON_PNG = base64.b64decode(
 )
 
 PORT         = int(os.environ.get('PORT', 8052))
+STORAGE      = os.environ.get('GOLF_STORAGE', 'json')   # 'json' or 'sqlite'
+SERVER_MODE  = os.environ.get('SERVER_MODE', 'threaded')  # 'threaded' or 'single'
+WORKERS      = int(os.environ.get('WORKERS', 16))         # threaded mode pool size
+KEEPALIVE_TIMEOUT = 15   # seconds an idle keep-alive connection is held open
+REQUEST_TIMEOUT   = 5    # seconds a worker waits on a client mid-request
 ROUNDS_FILE  = os.path.join(os.path.dirname(__file__), 'ghin_rounds.json')
 COURSES_FILE = os.path.join(os.path.dirname(__file__), 'courses.json')
 MATCHES_FILE = os.path.join(os.path.dirname(__file__), 'vd_matches.json')
+DRAFTS_FILE  = os.path.join(os.path.dirname(__file__), 'drafts.json')
 
 
 # ---------------------------------------------------------------------------
@@ -43,6 +64,20 @@ def parse_date(s):
             pass
     return date.min
 
+def normalize_date(s):
+    """ISO YYYY-MM-DD for any date parse_date understands; anything else unchanged."""
+    if not isinstance(s, str):
+        return s
+    d = parse_date(s.strip())
+    return d.isoformat() if d != date.min else s
+
+def date_ordinal(s):
+    # Stored dates are ISO since ingest normalizes them; strptime is only the fallback
+    try:
+        return date.fromisoformat(s).toordinal()
+    except (TypeError, ValueError):
+        return parse_date(s).toordinal() if isinstance(s, str) else date.min.toordinal()
+
 
 # ---------------------------------------------------------------------------
 # Data helpers
@@ -53,151 +88,1040 @@ def load_json(path):
             return json.load(f)
     return []
 
-def save_json(path, data):
-    with open(path, 'w') as f:
+# One lock per data file guards its read-modify-write cycles across threads.
+_file_locks  = {}
+_locks_guard = threading.Lock()
+
+def file_lock(path):
+    with _locks_guard:
+        return _file_locks.setdefault(path, threading.RLock())
+
+def write_json_tmp(path, data):
+    """Write `data` to <path>.tmp and fsync it; the caller renames it into place."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
         json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
 
-def load_rounds():  return load_json(ROUNDS_FILE)
-def load_courses(): return load_json(COURSES_FILE)
-def load_matches(): return load_json(MATCHES_FILE)
+def save_json(path, data):
+    # temp file + rename: readers see the old file or the new one, never a torn one
+    with file_lock(path):
+        os.replace(write_json_tmp(path, data), path)
 
-def save_round(r):
-    rounds = load_rounds()
-    new_id = max((x['id'] for x in rounds), default=0) + 1
-    r['id'] = new_id
+
+# ---------------------------------------------------------------------------
+# In-memory store — each JSON file is parsed once and served from memory.
+# A changed mtime/size (e.g. import_ghin.py ran) triggers a reload.
+# ---------------------------------------------------------------------------
+class JsonStore:
+    def __init__(self, path):
+        self.path    = path
+        self.lock    = file_lock(path)
+        self.data    = None
+        self.stamp   = None
+        self.version = 0      # bumps on every reload or write
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        with self.lock:
+            stamp = self._stat()
+            if self.data is None or stamp != self.stamp:
+                self.data    = load_json(self.path)
+                self.stamp   = stamp
+                self.version += 1
+            return self.data
+
+    def put(self, data):
+        with self.lock:
+            save_json(self.path, data)
+            self.data    = data
+            self.stamp   = self._stat()
+            self.version += 1
+
+
+# ---------------------------------------------------------------------------
+# Journaled store — mutations are appended (and fsync'd) to <file>.wal and a
+# background compactor folds the journal into the JSON snapshot.
+#
+# Journal ops:  {"op":"add","rec":{...}}
+#               {"op":"set","at":K,"rec":{...}}   (full record after the change)
+#               {"op":"del","at":K}
+#               {"op":"hole","at":K,"idx":N,"rec":{...}}   (draft rounds: cut
+#                    hole_results to N entries, then append rec)
+# K is the record's `key` field (round id) or its list position (matches).
+#
+# Compaction: write <file>.tmp, rename <file>.wal → <file>.wal.done, rename
+# .tmp over the snapshot, remove .wal.done.  A leftover .wal.done at startup
+# means the snapshot swap may not have happened yet, so it is rolled forward.
+# ---------------------------------------------------------------------------
+COMPACT_EVERY    = 50   # journal entries before the compactor is woken early
+COMPACT_INTERVAL = 30   # seconds between background compactions
+_compact_wake    = threading.Event()
+
+def apply_op(data, op, key=None):
+    """Apply one journal op to `data` in place. Returns False if its target is gone."""
+    if op['op'] == 'add':
+        data.append(op['rec'])
+        return True
+    if key:
+        i = next((i for i, x in enumerate(data) if x.get(key) == op['at']), None)
+    else:
+        i = op['at'] if 0 <= op['at'] < len(data) else None
+    if i is None:
+        return False
+    if op['op'] == 'set':
+        data[i] = op['rec']
+    elif op['op'] == 'hole':
+        holes = data[i].setdefault('hole_results', [])
+        del holes[op['idx']:]
+        holes.append(op['rec'])
+    else:
+        data.pop(i)
+    return True
+
+
+class JournaledStore(JsonStore):
+    def __init__(self, path, key=None):
+        super().__init__(path)
+        self.key     = key
+        self.wal     = path + '.wal'
+        self.pending = 0
+        self._fh     = None
+        self._recovered = False
+
+    def _recover(self):
+        done, tmp = self.wal + '.done', self.path + '.tmp'
+        if os.path.exists(done):
+            if os.path.exists(tmp):
+                os.replace(tmp, self.path)
+            os.remove(done)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+        self._trim_wal()
+        self._recovered = True
+
+    def _trim_wal(self):
+        """Cut a torn tail (crash mid-append) off the journal. _replay stops at it,
+        so anything appended after it would be skipped on the next start."""
+        if not os.path.exists(self.wal):
+            return
+        good, ended = 0, True
+        with open(self.wal, 'rb') as f:
+            for line in f:
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                good, ended = good + len(line), line.endswith(b'\n')
+        if good == os.path.getsize(self.wal) and ended:
+            return
+        with open(self.wal, 'r+b') as f:
+            f.truncate(good)
+            if not ended:
+                f.seek(good)
+                f.write(b'\n')   # a whole last op that just missed its newline
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay(self, data):
+        n = 0
+        if os.path.exists(self.wal):
+            with open(self.wal) as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        break         # torn tail from a crash mid-append
+                    apply_op(data, op, self.key)
+                    n += 1
+        return n
+
+    def get(self):
+        with self.lock:
+            if not self._recovered:
+                self._recover()
+            stamp = self._stat()
+            if self.data is None or stamp != self.stamp:
+                data         = load_json(self.path)
+                self.pending = self._replay(data)
+                self.data    = data
+                self.stamp   = stamp
+                self.version += 1
+            return self.data
+
+    def mutate(self, op):
+        return self.mutate_many([op])[0]
+
+    def mutate_many(self, ops):
+        """Journal a batch of ops with one write and one fsync."""
+        with self.lock:
+            data = self.get()
+            if self._fh is None:
+                self._fh = open(self.wal, 'a')
+            self._fh.write(''.join(json.dumps(op, separators=(',', ':')) + '\n' for op in ops))
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            oks = [apply_op(data, op, self.key) for op in ops]
+            self.version += 1
+            self.pending += len(ops)
+            if self.pending >= COMPACT_EVERY:
+                _compact_wake.set()
+            return oks
+
+    def compact(self):
+        with self.lock:
+            if not self.pending:
+                return
+            done = self.wal + '.done'
+            tmp  = write_json_tmp(self.path, self.get())
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            had_wal = os.path.exists(self.wal)
+            if had_wal:
+                os.replace(self.wal, done)
+            os.replace(tmp, self.path)
+            if had_wal:
+                os.remove(done)
+            self.stamp   = self._stat()
+            self.pending = 0
+
+    def put(self, data):
+        # Whole-file rewrite: fold it in like a compaction so the journal stays consistent
+        with self.lock:
+            self.get()
+            self.data    = data
+            self.pending += 1
+            self.version += 1
+            self.compact()
+
+
+# ---------------------------------------------------------------------------
+# SQLite store — same get/mutate/put interface over one sqlite_store table.
+# The in-memory copy is invalidated by the table's meta.version counter.
+# ---------------------------------------------------------------------------
+class SqliteStore:
+    def __init__(self, db, table, key=None):
+        self.db      = db
+        self.table   = table
+        self.key     = key
+        self.path    = f'{db.path}:{table}'
+        self.lock    = file_lock(self.path)
+        self.data    = None
+        self.stamp   = None
+        self.version = 0
+
+    def get(self):
+        with self.lock:
+            stamp = self.db.table_version(self.table)
+            if self.data is None or stamp != self.stamp:
+                self.data    = self.db.load_all(self.table)
+                self.stamp   = stamp
+                self.version += 1
+            return self.data
+
+    def mutate(self, op):
+        with self.lock:
+            data = self.get()
+            if self.table == 'rounds':
+                if op['op'] == 'del':
+                    self.db.delete_round(op['at'])
+                else:
+                    self.db.put_round(op['rec'])
+            elif op['op'] == 'add':
+                self.db.add_match(op['rec'])
+            elif op['op'] == 'set':
+                self.db.set_match(op['at'], op['rec'])
+            else:
+                self.db.delete_match(op['at'])
+            ok = apply_op(data, op, self.key)
+            self.stamp   = self.db.table_version(self.table)
+            self.version += 1
+            return ok
+
+    def mutate_many(self, ops):
+        """Appends go in as one transaction; anything else is applied op by op."""
+        if not all(op['op'] == 'add' for op in ops):
+            return [self.mutate(op) for op in ops]
+        with self.lock:
+            data = self.get()
+            recs = [op['rec'] for op in ops]
+            if self.table == 'rounds':
+                self.db.put_rounds(recs)
+            else:
+                self.db.add_matches(recs)
+            data.extend(recs)
+            self.stamp   = self.db.table_version(self.table)
+            self.version += 1
+            return [True] * len(ops)
+
+    def put(self, data):
+        with self.lock:
+            self.db.replace_all(self.table, data)
+            self.data    = data
+            self.stamp   = self.db.table_version(self.table)
+            self.version += 1
+
+    def compact(self):
+        pass   # SQLite checkpoints its own WAL
+
+
+if STORAGE == 'sqlite':
+    import sqlite_store
+    _db     = sqlite_store.Database()
+    ROUNDS  = SqliteStore(_db, 'rounds', key='id')
+    COURSES = SqliteStore(_db, 'courses')
+    MATCHES = SqliteStore(_db, 'matches')
+else:
+    ROUNDS  = JournaledStore(ROUNDS_FILE, key='id')
+    COURSES = JsonStore(COURSES_FILE)
+    MATCHES = JournaledStore(MATCHES_FILE)
+# Rounds in progress, one journal line per hole; short-lived, so always a JSON journal
+DRAFTS = JournaledStore(DRAFTS_FILE, key='id')
+
+def compact_all():
+    for store in (ROUNDS, MATCHES, DRAFTS):
+        try:
+            store.compact()
+        except OSError as e:
+            print(f'compaction of {store.path} failed: {e}')
+
+def _compactor():
+    while True:
+        _compact_wake.wait(COMPACT_INTERVAL)
+        _compact_wake.clear()
+        compact_all()
+
+def load_rounds():  return ROUNDS.get()
+def load_courses(): return COURSES.get()
+def load_matches(): return MATCHES.get()
+
+def seed_sqlite():
+    """First run on GOLF_STORAGE=sqlite: copy the JSON files into an empty database."""
+    if any(store.get() for store in (ROUNDS, MATCHES, COURSES)):
+        return
+    for store, src in ((ROUNDS, JournaledStore(ROUNDS_FILE, key='id')),
+                       (MATCHES, JournaledStore(MATCHES_FILE)), (COURSES, JsonStore(COURSES_FILE))):
+        store.put(src.get())
+
+def migrate_dates():
+    """One-time rewrite of legacy M/D/YYYY dates to ISO; a no-op once migrated."""
+    for store in (ROUNDS, MATCHES):
+        with store.lock:
+            data = store.get()
+            if any(normalize_date(x.get('date')) != x.get('date') for x in data):
+                store.put([{**x, 'date': normalize_date(x.get('date'))} for x in data])
+
+def _journal_round(op):
+    _journal_rounds([op])
+
+def _journal_rounds(ops):
+    """Journal ROUNDS ops and keep the handicap engine and hole index in step with them."""
+    synced = [e for e in (HANDICAP, HOLES) if e.version == ROUNDS.version]
+    ROUNDS.mutate_many(ops)
+    for e in synced:
+        for op in ops:
+            e.apply(op)
+        e.version = ROUNDS.version
+
+def _journal_match(op):
+    _journal_matches([op])
+
+def _journal_matches(ops):
+    """Journal MATCHES ops and keep the standings in step with them."""
+    synced = STANDINGS.version == MATCHES.version
+    MATCHES.mutate_many(ops)
+    if synced:
+        for op in ops:
+            STANDINGS.apply(op)
+        STANDINGS.version = MATCHES.version
+
+def _synced(engine, store, source=None):
+    """`engine` in step with `store`. The _journal_* helpers keep it there op by op;
+    anything else that moved the store (startup, an edit from outside) rebuilds
+    it from `source()`, or the whole store. Call with store.lock held."""
+    records = store.get()
+    if engine.version != store.version:
+        engine.rebuild(source() if source else records)
+        engine.version = store.version
+    return engine
+
+def _synced_handicap():
+    # SQLite hands over just the posted rounds, off the rounds_posted index
+    return _synced(HANDICAP, ROUNDS,
+                   (lambda: ROUNDS.db.posted_rounds(None)) if STORAGE == 'sqlite' else None)
+
+def calc_differential(r):
     if r.get('rating') and r.get('slope') and r.get('adj_score') is not None:
         r['differential'] = round((r['adj_score'] - r['rating']) * 113 / r['slope'], 1)
-    rounds.append(r)
-    save_json(ROUNDS_FILE, rounds)
+
+def _keyed(records, key):
+    """The record an earlier request with this Idempotency-Key created, if any."""
+    return next((x for x in reversed(records) if x.get('idempotency_key') == key), None) if key else None
+
+def save_round(r):
+    with ROUNDS.lock:
+        rounds = load_rounds()
+        dup = _keyed(rounds, r.get('idempotency_key'))
+        if dup:
+            return dup
+        r['id'] = max((x['id'] for x in rounds), default=0) + 1
+        r['date'] = normalize_date(r.get('date'))
+        calc_differential(r)
+        _journal_round({'op': 'add', 'rec': r})
     return r
 
+def round_error(r):
+    """Why a posted round can't be stored, or None."""
+    if not isinstance(r, dict):
+        return 'round must be an object'
+    if parse_date(str(r.get('date', '')).strip()) == date.min:
+        return 'date must be YYYY-MM-DD or M/D/YYYY'
+    for k in ('score', 'adj_score', 'rating', 'slope', 'course_hdcp'):
+        v = r.get(k)
+        if v is not None and (isinstance(v, bool) or not isinstance(v, (int, float))):
+            return f'{k} must be a number'
+    if not isinstance(r.get('adj_score'), (int, float)):
+        return 'adj_score is required'
+    if not isinstance(r.get('hole_results') or [], list):
+        return 'hole_results must be a list'
+    if not isinstance(r.get('vd_match') or {}, dict):
+        return 'vd_match must be an object'
+    return None
+
+def save_rounds(items):
+    """Store many rounds (and their vd_matches) with one journal write per file.
+
+    Invalid items are skipped; returns one result per item, in order.
+    """
+    results, ops = [], []
+    with ROUNDS.lock:
+        rounds  = load_rounds()
+        next_id = max((x['id'] for x in rounds), default=0) + 1
+        seen    = {x['idempotency_key']: x['id'] for x in rounds if x.get('idempotency_key')}
+        for i, r in enumerate(items):
+            err = str(r) if isinstance(r, ValueError) else round_error(r)
+            if err:
+                results.append({'index': i, 'ok': False, 'error': err})
+                continue
+            key = r.get('idempotency_key')
+            if key in seen:
+                results.append({'index': i, 'ok': True, 'id': seen[key], 'duplicate': True})
+                continue
+            r['id'], next_id = next_id, next_id + 1
+            if key:
+                seen[key] = r['id']
+            r['date'] = normalize_date(r.get('date'))
+            calc_differential(r)
+            ops.append({'op': 'add', 'rec': r})
+            results.append({'index': i, 'ok': True, 'id': r['id']})
+        if ops:
+            _journal_rounds(ops)
+    matches = [op['rec']['vd_match'] for op in ops if op['rec'].get('vd_match')]
+    if matches:
+        with MATCHES.lock:
+            for m in matches:
+                m['date'] = normalize_date(m.get('date'))
+            _journal_matches([{'op': 'add', 'rec': m} for m in matches])
+    return results
+
+DRAFT_FIELDS = ('date', 'course_id', 'course_name', 'rating', 'slope', 'par', 'course_hdcp',
+                'include_ghin', 'nine_hole', 'vd_enabled', 'nines', 'start_offset',
+                'initial_honor', 'round_key', 'idempotency_key')
+
+def draft_error(body):
+    """Why a draft header can't be opened, or None."""
+    if not isinstance(body, dict):
+        return 'draft must be an object'
+    if parse_date(str(body.get('date') or '').strip()) == date.min:
+        return 'date must be YYYY-MM-DD or M/D/YYYY'
+    for k in ('rating', 'slope', 'par', 'course_hdcp', 'start_offset'):
+        v = body.get(k)
+        if v is not None and (isinstance(v, bool) or not isinstance(v, (int, float))):
+            return f'{k} must be a number'
+    if not isinstance(body.get('nines') or [], list) or not all(
+            isinstance(n, str) for n in body.get('nines') or []):
+        return 'nines must be a list of names'
+    if body.get('initial_honor') not in (None, 'V', 'D'):
+        return "initial_honor must be 'V' or 'D'"
+    if body.get('round_key') is not None and not re.fullmatch(r'[\w-]{1,64}', str(body['round_key'])):
+        return 'round_key must be 1-64 letters, digits, - or _'
+    return None
+
+def _draft(draft_id):
+    return next((x for x in DRAFTS.get() if str(x['id']) == draft_id), None)
+
+def start_draft(body):
+    """Open a draft round from its header fields; holes follow one at a time.
+
+    `round_key` is the Idempotency-Key the client would post the whole round
+    with, so a finalized draft and a fallback POST /api/rounds can't both land.
+    It is also the draft's id, so ids never repeat: a stale id held by a phone
+    or replayed from its outbox can't reach a newer round's draft.
+    """
+    err = draft_error(body)
+    if err:
+        raise ValueError(err)
+    with DRAFTS.lock:
+        dup = _keyed(DRAFTS.get(), body.get('idempotency_key'))
+        if dup:
+            return dup
+        draft_id = str(body.get('round_key') or uuid.uuid4().hex)
+        dup = _draft(draft_id)
+        if dup:
+            return dup
+        if _keyed(load_rounds(), draft_id):
+            raise LookupError('that round is already saved')
+        d = {k: body[k] for k in DRAFT_FIELDS if k in body}
+        d.update(id=draft_id, date=normalize_date(d['date']), hole_results=[],
+                 started=datetime.now().isoformat(timespec='seconds'))
+        DRAFTS.mutate({'op': 'add', 'rec': d})
+        return d
+
+def draft_hole(draft_id, body):
+    """Append one hole, or redo from `idx` on when it names an earlier one; returns holes recorded."""
+    with DRAFTS.lock:
+        d = _draft(draft_id)
+        if d is None:
+            return None
+        if not all(isinstance(body.get(k), int) for k in ('par', 'gross', 'adj')):
+            raise ValueError('hole needs par, gross and adj')
+        vd = body.get('vd')
+        if vd is not None and not (isinstance(vd, dict) and all(
+                isinstance(vd.get(k), int) for k in ('vGross', 'dGross', 'vNet', 'dNet'))):
+            raise ValueError('vd needs vGross, dGross, vNet and dNet')
+        hole = {k: v for k, v in body.items() if k != 'idx'}
+        idx  = body.get('idx', len(d['hole_results']))
+        if not isinstance(idx, int) or not 0 <= idx <= len(d['hole_results']):
+            raise ValueError('idx must point at a recorded hole or the next one')
+        if idx < len(d['hole_results']) and d['hole_results'][idx] == hole:
+            return len(d['hole_results'])     # a resend; don't drop the holes after it
+        DRAFTS.mutate({'op': 'hole', 'at': d['id'], 'idx': idx, 'rec': hole})
+        return len(d['hole_results'])
+
+def finalize_draft(draft_id, body):
+    """Turn a draft into a saved round: totals and adjusted score from its holes,
+    the differential via save_round, and the VD result re-scored with vd_scoring
+    unless the client sends its own vd_match.
+
+    `body` may override include_ghin / nine_hole and carries the number of
+    `holes` the client recorded. It may also carry the whole round, as
+    POST /api/rounds takes it; that is saved instead when the draft is gone
+    or missed holes, so a finalize replayed from the offline queue can't
+    lose the round. Without it a mismatch raises LookupError.
+    """
+    with DRAFTS.lock:
+        d = _draft(draft_id)
+        if d is None or body.get('holes', len(d['hole_results'])) != len(d['hole_results']):
+            if body.get('hole_results') and round_error(body) is None:
+                return _finalize_whole(d, body)
+            if d is None:
+                return None
+            raise LookupError(f"draft has {len(d['hole_results'])} holes, client has {body['holes']}")
+        holes = d['hole_results']
+        if not holes:
+            raise ValueError('draft has no holes')
+        key = d.get('round_key') or body.get('idempotency_key')
+        r = {k: d[k] for k in DRAFT_FIELDS[:7] if k in d}
+        r['score']        = sum(h.get('gross') or 0 for h in holes)
+        r['adj_score']    = sum(h.get('adj') or 0 for h in holes)
+        r['include_ghin'] = body.get('include_ghin', d.get('include_ghin', True))
+        r['nine_hole']    = body.get('nine_hole', d.get('nine_hole') or r['adj_score'] < 60)
+        r['hole_results'] = holes
+        r['idempotency_key'] = key
+        vd_match = body.get('vd_match')
+        if vd_match is None and d.get('vd_enabled') and any(h.get('vd') for h in holes):
+            offset = d.get('start_offset') or 0
+            res = vd_scoring.replay(holes, d.get('nines') or (), offset, d.get('initial_honor'))
+            vd_match = {'date': r['date'], 'winner': res['winner'], 'margin': res['margin'],
+                        'honor_next': res['honor_next'], 'nines': d.get('nines') or [],
+                        'historical': False, 'start_offset': offset,
+                        'initial_honor': d.get('initial_honor') or 'D'}
+        if isinstance(vd_match, dict):
+            vd_match['idempotency_key'] = key
+        r['vd_match'] = vd_match
+        err = round_error(r)
+        if err:
+            raise ValueError(err)
+        saved = save_round(r)
+        if vd_match:
+            append_match(vd_match)
+        DRAFTS.mutate({'op': 'del', 'at': d['id']})
+        return saved
+
+def _finalize_whole(d, body):
+    """finalize_draft's fallback: save the round the client sent, as POST /api/rounds would."""
+    key = (d or {}).get('round_key') or body.get('round_key') or body.get('idempotency_key')
+    r = {k: v for k, v in body.items() if k not in ('holes', 'round_key')}
+    r['idempotency_key'] = key
+    if isinstance(r.get('vd_match'), dict):
+        r['vd_match']['idempotency_key'] = key
+    saved = save_round(r)
+    if r.get('vd_match'):
+        append_match(r['vd_match'])
+    close_drafts(key)
+    if d is not None:
+        discard_draft(d['id'])
+    return saved
+
+def discard_draft(draft_id):
+    with DRAFTS.lock:
+        d = _draft(str(draft_id))
+        if d is not None:
+            DRAFTS.mutate({'op': 'del', 'at': d['id']})
+            return True
+    return False
+
+def close_drafts(round_key):
+    """Drop drafts of a round that was posted whole after all (e.g. its draft
+    was only created from the offline queue)."""
+    with DRAFTS.lock:
+        ids = [x['id'] for x in DRAFTS.get() if round_key and x.get('round_key') == round_key]
+        if ids:
+            DRAFTS.mutate_many([{'op': 'del', 'at': i} for i in ids])
+
 def save_course(c):
-    courses = load_courses()
-    courses.append(c)
-    save_json(COURSES_FILE, courses)
+    with COURSES.lock:
+        courses = load_courses()
+        courses.append(c)
+        COURSES.put(courses)
 
 def append_match(m):
-    matches = load_matches()
-    matches.append(m)
-    save_json(MATCHES_FILE, matches)
+    with MATCHES.lock:
+        if _keyed(load_matches(), m.get('idempotency_key')):
+            return
+        m['date'] = normalize_date(m.get('date'))
+        _journal_match({'op': 'add', 'rec': m})
 
 def update_match(idx, updates):
-    matches = load_matches()
-    if 0 <= idx < len(matches):
-        matches[idx].update(updates)
-        save_json(MATCHES_FILE, matches)
-        return True
+    with MATCHES.lock:
+        matches = load_matches()
+        if 0 <= idx < len(matches):
+            m = {**matches[idx], **updates}
+            m['date'] = normalize_date(m.get('date'))
+            _journal_match({'op': 'set', 'at': idx, 'rec': m})
+            return True
     return False
 
 def delete_match(idx):
-    matches = load_matches()
-    if 0 <= idx < len(matches):
-        matches.pop(idx)
-        save_json(MATCHES_FILE, matches)
-        return True
+    with MATCHES.lock:
+        if 0 <= idx < len(load_matches()):
+            _journal_match({'op': 'del', 'at': idx})
+            return True
     return False
 
 def update_round(round_id, updates):
-    rounds = load_rounds()
-    for r in rounds:
-        if r['id'] == round_id:
-            for k, v in updates.items():
-                r[k] = v
-            if r.get('rating') and r.get('slope') and r.get('adj_score') is not None:
-                r['differential'] = round((r['adj_score'] - r['rating']) * 113 / r['slope'], 1)
-            save_json(ROUNDS_FILE, rounds)
-            return r
+    with ROUNDS.lock:
+        for r in load_rounds():
+            if r['id'] == round_id:
+                r = {**r, **updates}
+                r['date'] = normalize_date(r.get('date'))
+                calc_differential(r)
+                _journal_round({'op': 'set', 'at': round_id, 'rec': r})
+                return r
     return None
 
 def delete_round(round_id):
-    rounds = load_rounds()
-    new_rounds = [r for r in rounds if r['id'] != round_id]
-    if len(new_rounds) == len(rounds):
-        return False
-    save_json(ROUNDS_FILE, new_rounds)
-    return True
+    with ROUNDS.lock:
+        if any(r['id'] == round_id for r in load_rounds()):
+            _journal_round({'op': 'del', 'at': round_id})
+            return True
+    return False
 
 
 # ---------------------------------------------------------------------------
 # Handicap calculations
 # ---------------------------------------------------------------------------
-def get_handicap_data():
-    rounds = load_rounds()
-    posted = [r for r in rounds
-              if r.get('include_ghin') and r.get('differential') is not None]
-    posted.sort(key=lambda r: parse_date(r['date']))
-
-    last_20 = posted[-20:]
-    diffs   = [r['differential'] for r in last_20]
-    n       = len(diffs)
-
-    index = anti_idx = target_diff = None
-    if n >= 8:
-        sd        = sorted(diffs)
-        index     = round(sum(sd[:8]) / 8, 1)
-        anti_idx  = round(sum(sd[-8:]) / 8, 1)
-        best_8    = sd[:8]
-        oldest_d  = last_20[0]['differential']
-        target_diff = oldest_d if oldest_d in best_8 else max(best_8)
-    elif n >= 1:
-        index = round(sum(diffs) / n, 1)
-
-    # Rolling index series for chart
-    series = []
-    for i, r in enumerate(posted):
-        w  = posted[max(0, i - 19):i + 1]
-        wd = sorted(x['differential'] for x in w)
-        idx_after = round(sum(wd[:8]) / 8, 1) if len(wd) >= 8 else round(sum(wd) / len(wd), 1)
-        series.append({
+def window_index(w):
+    """Index from a sorted window of differentials: best 8, or the mean if fewer."""
+    return round(sum(w[:8]) / 8, 1) if len(w) >= 8 else round(sum(w) / len(w), 1)
+
+
+class HandicapEngine:
+    """Rolling handicap state, updated per posted round instead of per request.
+
+    `posted` is kept in date order next to bisectable `keys`; `window` is the
+    sorted last-20 differentials. Appending a round slides the window in
+    O(log 20); edits to older rounds recompute the series from that point on.
+    """
+    def __init__(self):
+        self.version = None     # ROUNDS.version this state reflects
+        self.rebuild([])
+
+    def rebuild(self, rounds):
+        self.posted  = []
+        self.keys    = []
+        self.key_of  = {}
+        self.series  = []
+        self.window  = []
+        self.by_year = defaultdict(list)
+        for r in sorted(filter(self._eligible, rounds), key=self._key):
+            self.add(r)
+
+    @staticmethod
+    def _eligible(r):
+        return bool(r.get('include_ghin')) and r.get('differential') is not None
+
+    @staticmethod
+    def _key(r):
+        return (date_ordinal(r['date']), r.get('id', 0))
+
+    def _slide(self, i):
+        if i >= 20:
+            w = self.window
+            w.pop(bisect_left(w, self.posted[i - 20]['differential']))
+        insort(self.window, self.posted[i]['differential'])
+        r = self.posted[i]
+        self.series.append({
             'date': r['date'], 'differential': r['differential'],
-            'index_after': idx_after, 'course': r.get('course_name', ''),
+            'index_after': window_index(self.window), 'course': r.get('course_name', ''),
         })
 
-    # Yearly averages
-    by_year = defaultdict(list)
-    for r in posted:
+    def _recompute_from(self, pos):
+        del self.series[pos:]
+        self.window = sorted(r['differential'] for r in self.posted[max(0, pos - 20):pos])
+        for i in range(pos, len(self.posted)):
+            self._slide(i)
+
+    def add(self, r):
+        if not self._eligible(r):
+            return
+        key = self._key(r)
+        pos = bisect_right(self.keys, key)
+        self.keys.insert(pos, key)
+        self.posted.insert(pos, r)
+        self.key_of[r['id']] = key
+        self.by_year[str(date.fromordinal(key[0]).year)].append(r['differential'])
+        if pos == len(self.posted) - 1:
+            self._slide(pos)
+        else:
+            self._recompute_from(pos)
+
+    def remove(self, round_id):
+        key = self.key_of.pop(round_id, None)
+        if key is None:
+            return
+        pos = bisect_left(self.keys, key)
+        r = self.posted.pop(pos)
+        del self.keys[pos]
+        self.by_year[str(date.fromordinal(key[0]).year)].remove(r['differential'])
+        self._recompute_from(pos)
+
+    def apply(self, op):
+        """Mirror one ROUNDS journal op."""
+        if op['op'] != 'add':
+            self.remove(op['at'])
+        if op['op'] != 'del':
+            self.add(op['rec'])
+
+    def snapshot(self, courses):
+        posted, w = self.posted, self.window
+        n = len(w)
+
+        index = anti_idx = target_diff = None
+        if n >= 8:
+            index     = window_index(w)
+            anti_idx  = round(sum(w[-8:]) / 8, 1)
+            oldest_d  = posted[-n]['differential']
+            target_diff = oldest_d if oldest_d in w[:8] else w[7]
+        elif n >= 1:
+            index = window_index(w)
+
+        yearly_avgs = [{'year': y, 'avg': round(sum(d) / len(d), 1)}
+                       for y, d in sorted(self.by_year.items()) if d]
+        ghin_series = [{'date': r['date'], 'ghin': r['ghin_manual']}
+                       for r in posted if r.get('ghin_manual') is not None]
+
+        last_20_avg = round(sum(w) / n, 1) if n else None
+        yr_diffs = self.by_year.get(str(date.today().year))
+        year_avg = round(sum(yr_diffs) / len(yr_diffs), 1) if yr_diffs else None
+
+        # Budget: target_diff on most recent 18-hole posted course
+        budget = target_course = target_par = target_holes = None
+        if target_diff is not None:
+            for r in reversed(posted):
+                if not r.get('nine_hole') and r.get('rating') and r.get('slope'):
+                    target_par = r.get('par', 72)
+                    budget = math.floor(r['rating'] + target_diff * r['slope'] / 113) - target_par
+                    target_course = r.get('course_name', '')
+                    cid = r.get('course_id')
+                    if cid:
+                        target_holes = next((c['holes'] for c in courses
+                                             if c.get('id') == cid and c.get('holes')), None)
+                    break
+
+        return {
+            'index': index, 'anti_index': anti_idx, 'target_diff': target_diff,
+            'budget': budget, 'target_course': target_course, 'target_par': target_par,
+            'target_holes': target_holes or [],
+            'last_20_avg': last_20_avg, 'year_avg': year_avg,
+            'series': list(self.series), 'yearly_avgs': yearly_avgs, 'ghin_series': ghin_series,
+            'n_posted': len(posted), 'n_last_20': n,
+        }
+
+
+HANDICAP = HandicapEngine()
+
+def get_handicap_data():
+    with ROUNDS.lock:
+        return _synced_handicap().snapshot(load_courses())
+
+def handicap_analytics(sma_n=5, whatif=()):
+    with ROUNDS.lock:
+        posted = list(_synced_handicap().posted)
+    data = analytics.analyze(posted, sma_n)
+    if whatif:
+        data['what_if'] = analytics.what_if(posted, whatif, sma_n)
+    return data
+
+# ---------------------------------------------------------------------------
+# VD standings
+# ---------------------------------------------------------------------------
+STANDINGS = Standings()
+
+def standings_data(limit=None):
+    """The standings, with only the last `limit` match rows when given; the
+    standing, record and n_matches still cover every match."""
+    with MATCHES.lock:
+        vd = _synced(STANDINGS, MATCHES).snapshot()
+    if limit is not None:
+        vd['matches'] = vd['matches'][max(len(vd['matches']) - limit, 0):]
+    return vd
+
+def vd_audit():
+    """Re-score every VD round from its hole_results and compare with vd_matches.json."""
+    with ROUNDS.lock, MATCHES.lock:
+        return vd_scoring.audit(load_rounds(), load_matches())
+
+
+# ---------------------------------------------------------------------------
+# Live matches — fed by the recording phone, streamed to spectators over SSE
+# ---------------------------------------------------------------------------
+LIVE = LiveMatches(Broadcaster())
+
+
+# ---------------------------------------------------------------------------
+# Per-hole index
+# ---------------------------------------------------------------------------
+HOLES = HoleIndex()
+
+def hole_stats(course_id=None, hole=None, group=None):
+    with ROUNDS.lock:
+        return _synced(HOLES, ROUNDS).stats(course_id, hole, group)
+
+
+# ---------------------------------------------------------------------------
+# Bulk round bodies — a JSON array, or NDJSON (one round per line)
+# ---------------------------------------------------------------------------
+def parse_bulk(raw):
+    """Items for save_rounds; an unparsable NDJSON line becomes a ValueError item."""
+    text = raw.decode('utf-8')
+    if text.lstrip().startswith('['):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError('expected a JSON array')
+        return items
+    items = []
+    for n, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
         try:
-            yr = str(parse_date(r['date']).year)
-        except Exception:
-            yr = r['date'][:4]
-        by_year[yr].append(r['differential'])
-    yearly_avgs = [{'year': y, 'avg': round(sum(d) / len(d), 1)}
-                   for y, d in sorted(by_year.items())]
-
-    # GHIN manual series
-    ghin_series = [{'date': r['date'], 'ghin': r['ghin_manual']}
-                   for r in posted if r.get('ghin_manual') is not None]
-
-    last_20_avg = round(sum(diffs) / n, 1) if n else None
-    cy = str(date.today().year)
-    yr_diffs = [r['differential'] for r in posted
-                if str(parse_date(r['date']).year) == cy]
-    year_avg = round(sum(yr_diffs) / len(yr_diffs), 1) if yr_diffs else None
-
-    # Budget: target_diff on most recent 18-hole posted course
-    budget = target_course = target_par = target_holes = None
-    if target_diff is not None:
-        for r in reversed(posted):
-            if not r.get('nine_hole') and r.get('rating') and r.get('slope'):
-                target_par = r.get('par', 72)
-                budget = math.floor(r['rating'] + target_diff * r['slope'] / 113) - target_par
-                target_course = r.get('course_name', '')
-                cid = r.get('course_id')
-                if cid:
-                    for c in load_courses():
-                        if c.get('id') == cid and c.get('holes'):
-                            target_holes = c['holes']
-                            break
-                break
-
-    return {
-        'index': index, 'anti_index': anti_idx, 'target_diff': target_diff,
-        'budget': budget, 'target_course': target_course, 'target_par': target_par,
-        'target_holes': target_holes or [],
-        'last_20_avg': last_20_avg, 'year_avg': year_avg,
-        'series': series, 'yearly_avgs': yearly_avgs, 'ghin_series': ghin_series,
-        'n_posted': len(posted), 'n_last_20': n,
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(ValueError(f'line {n} is not valid JSON'))
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Paging / filtering for GET /api/rounds and /api/matches
+# ---------------------------------------------------------------------------
+def _query_params(q):
+    """Parsed paging/filter params shared by query_records and query_rounds_sql."""
+    p = {
+        'desc':   q.get('order') == 'desc',
+        'limit':  int(q['limit']) if 'limit' in q else None,
+        'skip':   int(q.get('offset', 0)),
+        'cursor': int(q['cursor']) if 'cursor' in q else None,
+        'since':  date.fromisoformat(q['since']) if 'since' in q else None,
+        'until':  date.fromisoformat(q['until']) if 'until' in q else None,
+        'incl':   q['include_ghin'].lower() in ('1', 'true', 'yes') if 'include_ghin' in q else None,
     }
+    if (p['limit'] is not None and p['limit'] < 0) or p['skip'] < 0:
+        raise ValueError('limit and offset must be >= 0')
+    fields    = [f for f in q.get('fields', '').split(',') if f]
+    p['drop'] = {f[1:] for f in fields if f.startswith('-')}
+    p['keep'] = [f for f in fields if not f.startswith('-')]
+    return p
+
+def _project(x, p):
+    if p['keep']:
+        return {f: x[f] for f in p['keep'] if f in x}
+    if p['drop']:
+        return {f: v for f, v in x.items() if f not in p['drop']}
+    return x
+
+def query_records(records, q, key=None):
+    """Filter, page and project a rounds/matches list from query params.
+
+    limit, offset, order=asc|desc, cursor (key of the last item seen),
+    since/until (YYYY-MM-DD, inclusive), course_id, include_ghin and
+    fields=a,b or fields=-hole_results. Rounds are keyed by `key` ('id');
+    matches by list position, which is added to each item as `idx`.
+    Returns (items, next_cursor) — next_cursor is None on the last page.
+    """
+    p = _query_params(q)
+    desc, limit, skip, cursor, incl = p['desc'], p['limit'], p['skip'], p['cursor'], p['incl']
+    since = p['since'].toordinal() if p['since'] else None
+    until = p['until'].toordinal() if p['until'] else None
+
+    items, last = [], None
+    for i in (range(len(records) - 1, -1, -1) if desc else range(len(records))):
+        x = records[i]
+        k = x.get(key) if key else i
+        if cursor is not None and (k >= cursor if desc else k <= cursor):
+            continue
+        if since is not None or until is not None:
+            o = date_ordinal(x.get('date') or '')
+            if o == date.min.toordinal() or (since and o < since) or (until and o > until):
+                continue
+        if 'course_id' in q and x.get('course_id') != q['course_id']:
+            continue
+        if incl is not None and bool(x.get('include_ghin')) != incl:
+            continue
+        if skip:
+            skip -= 1
+            continue
+        if limit is not None and len(items) == limit:
+            return items, last
+        if not key:
+            x = {**x, 'idx': i}
+        items.append(_project(x, p))
+        last = k
+    return items, None
+
+def query_rounds_sql(db, q):
+    """query_records for rounds on the SQLite backend: filters, order and the
+    page run in SQL on the rounds indexes, so only that page is decoded."""
+    p = _query_params(q)
+    where, params = [], []
+    if p['cursor'] is not None:
+        where.append('id < ?' if p['desc'] else 'id > ?')
+        params.append(p['cursor'])
+    if p['since'] or p['until']:
+        where.append("date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'")
+    if p['since']:
+        where.append('date >= ?')
+        params.append(p['since'].isoformat())
+    if p['until']:
+        where.append('date <= ?')
+        params.append(p['until'].isoformat())
+    if 'course_id' in q:
+        where.append('course_id = ?')
+        params.append(q['course_id'])
+    if p['incl'] is not None:
+        where.append('include_ghin = ?')
+        params.append(int(p['incl']))
+    limit = p['limit']
+    rows = db.rounds('WHERE ' + ' AND '.join(where) if where else '', params,
+                     order='id DESC' if p['desc'] else 'id',
+                     limit=limit + 1 if limit is not None else None, offset=p['skip'])
+    more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if more else rows
+    return [_project(x, p) for x in rows], rows[-1]['id'] if more and rows else None
+
+
+# Serialized /api/handicap body, rebuilt only when rounds or courses change
+# (or the calendar year rolls over, which moves year_avg).
+HANDICAP_POINTS = 200   # chart points the PWA asks for; plenty for a phone-width chart
+
+def downsample_handicap(data, points, envelope=False):
+    """`data` with series/ghin_series cut to `points` by LTTB on the differentials.
+
+    The last WINDOW - 1 rounds are kept as they are: the PWA projects the
+    next index from them. With `envelope`, each series point also carries
+    the min/max differential and index over the rounds it stands for.
+    """
+    series = data['series']
+    keep = min(analytics.WINDOW - 1, len(series))
+    head = len(series) - keep
+    picked, buckets = analytics.lttb([r['differential'] for r in series[:head]], max(points - keep, 3))
+    picked  += range(head, len(series))
+    buckets += [(i, i + 1) for i in range(head, len(series))]
+    out = []
+    for i, (a, b) in zip(picked, buckets):
+        pt = dict(series[i])
+        if envelope:
+            span = series[a:b]
+            pt.update(n=b - a,
+                      diff_min=min(r['differential'] for r in span), diff_max=max(r['differential'] for r in span),
+                      index_min=min(r['index_after'] for r in span), index_max=max(r['index_after'] for r in span))
+        out.append(pt)
+    gs = data['ghin_series']
+    g_picked, _ = analytics.lttb([r['ghin'] for r in gs], points)
+    return {**data, 'series': out, 'ghin_series': [gs[i] for i in g_picked],
+            'n_series': len(series)}
+
+_handicap_cache = {'key': None, 'bodies': {}}
+
+def _handicap_variant(points, envelope):
+    """(data, Precompressed body) for one /api/handicap variant, cached until rounds change."""
+    with ROUNDS.lock:
+        load_rounds(); load_courses()   # pick up external edits before keying
+        key = (ROUNDS.version, COURSES.version, date.today().year)
+        if _handicap_cache['key'] != key or len(_handicap_cache['bodies']) > 8:
+            _handicap_cache.update(key=key, bodies={})
+        variant = (points, envelope)
+        if variant not in _handicap_cache['bodies']:
+            data = get_handicap_data()
+            if points:
+                data = downsample_handicap(data, points, envelope)
+            _handicap_cache['bodies'][variant] = (data, Precompressed(json.dumps(data), fast=True))
+        return _handicap_cache['bodies'][variant]
+
+def handicap_payload(points=None, envelope=False):
+    """Precompressed /api/handicap body (carries its own ETag), optionally downsampled."""
+    return _handicap_variant(points, envelope)[1]
+
+def bootstrap_data(n=30, points=HANDICAP_POINTS):
+    """Everything the PWA needs at launch, taken from one consistent snapshot:
+    the latest n rounds and the last n matches (oldest first, as
+    /api/standings?limit=n lists them) seed the History tab; the handicap
+    comes from the /api/handicap?points= cache."""
+    with ROUNDS.lock, MATCHES.lock, COURSES.lock:
+        rounds, _ = query_records(load_rounds(),
+                                  {'order': 'desc', 'limit': n, 'fields': '-hole_results'}, 'id')
+        vd = standings_data(n)
+        return {
+            'courses':  load_courses(),
+            'handicap': _handicap_variant(points, False)[0],
+            'vd':       {'standing': vd['standing'], 'n_matches': vd['n_matches'],
+                         'record': vd['record']},
+            'rounds':   rounds,
+            'matches':  vd['matches'],
+        }
+
+def make_etag(data):
+    return '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match, etag):
+    # weak comparison; also accept the per-encoding variants _send hands out
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for t in if_none_match.split(','):
+        t = t.strip().removeprefix('W/')
+        if re.sub(r'-(gzip|br)"$', '"', t) == etag:
+            return True
+    return False
 
 
 MANIFEST_JSON = json.dumps({
@@ -216,8 +1140,8 @@ MANIFEST_JSON = json.dumps({
 # Service Worker
 # ---------------------------------------------------------------------------
 SW_JS = """
-const CACHE = 'golf-log-v24';
-const CORE = ['/icon.png', '/manifest.json'];
+const CACHE = 'golf-log-__BUILD__';
+const CORE = __CORE__;
 self.addEventListener('install', e => {
   e.waitUntil(caches.open(CACHE).then(c => c.addAll(CORE)));
   self.skipWaiting();
@@ -225,21 +1149,103 @@ self.addEventListener('install', e => {
 self.addEventListener('activate', e => e.waitUntil(
   caches.keys().then(keys => Promise.all(
     keys.filter(k => k !== CACHE).map(k => caches.delete(k))
-  )).then(() => clients.claim())
+  )).then(() => clients.claim()).then(replay)
 ));
+
+// ── Offline outbox: API writes that can't reach the server wait in IndexedDB
+// and are replayed in order (Background Sync, or the page's 'online' ping).
+// Each carries an Idempotency-Key so a replay the server already saw is a no-op.
+// A write the server keeps failing moves to the 'dead' store after OUTBOX_TRIES
+// passes, so it can't hold up the writes queued behind it.
+const OUTBOX_TRIES = 5;
+const newKey = () => self.crypto && crypto.randomUUID ? crypto.randomUUID()
+  : Date.now().toString(36) + Math.random().toString(36).slice(2);
+function outbox(mode, fn) {
+  return new Promise((resolve, reject) => {
+    const open = indexedDB.open('golf-log', 2);
+    open.onupgradeneeded = () => {
+      const db = open.result;
+      if (!db.objectStoreNames.contains('outbox')) db.createObjectStore('outbox', {keyPath: 'seq', autoIncrement: true});
+      if (!db.objectStoreNames.contains('dead')) db.createObjectStore('dead', {keyPath: 'seq'});
+    };
+    open.onerror = () => reject(open.error);
+    open.onsuccess = () => {
+      const tx = open.result.transaction(['outbox', 'dead'], mode);
+      const req = fn(tx.objectStore('outbox'), tx.objectStore('dead'));
+      tx.oncomplete = () => resolve(req && req.result);
+      tx.onerror = () => reject(tx.error);
+    };
+  });
+}
+async function enqueue(item) {
+  await outbox('readwrite', s => s.add(item));
+  if (self.registration.sync) self.registration.sync.register('golf-outbox').catch(() => {});
+  return new Response(JSON.stringify({ok: true, queued: true}),
+    {status: 202, headers: {'Content-Type': 'application/json'}});
+}
+const send = item => fetch(item.url, {method: item.method, body: item.body,
+  headers: {'Content-Type': item.type, 'Idempotency-Key': item.key}});
+async function failed(item, why) {
+  // true when the item is set aside and the pass can go on to the next one
+  item.attempts = (item.attempts || 0) + 1;
+  if (item.attempts < OUTBOX_TRIES) { await outbox('readwrite', s => s.put(item)); return false; }
+  await outbox('readwrite', (s, dead) => { dead.put({...item, why, failed: Date.now()}); return s.delete(item.seq); });
+  for (const c of await clients.matchAll()) c.postMessage({type: 'outbox-dead', url: item.url, why});
+  return true;
+}
+let replaying = null;
+function replay() {
+  // one pass at a time, in order; a failure stops the pass and keeps the rest,
+  // unless it was that item's last try
+  return replaying = replaying || (async () => {
+    try {
+      for (const item of await outbox('readonly', s => s.getAll())) {
+        let resp;
+        try { resp = await send(item); }
+        catch (err) {
+          // offline: not the item's fault, so it doesn't count
+          if (self.navigator.onLine === false || !await failed(item, String(err))) break;
+          continue;
+        }
+        if (resp.status >= 500 && !await failed(item, `HTTP ${resp.status}`)) break;
+        if (resp.status < 500) await outbox('readwrite', s => s.delete(item.seq));
+      }
+    } catch (err) {
+    } finally { replaying = null; }
+  })();
+}
+async function write(req) {
+  const item = {url: req.url, method: req.method, body: await req.text(),
+    type: req.headers.get('Content-Type') || 'application/json',
+    key: req.headers.get('Idempotency-Key') || newKey()};
+  // anything already queued goes first, so this write queues behind it
+  if (await outbox('readonly', s => s.count())) { const r = await enqueue(item); replay(); return r; }
+  try {
+    const resp = await send(item);
+    return resp.status >= 500 ? enqueue(item) : resp;
+  } catch (err) { return enqueue(item); }
+}
+self.addEventListener('sync', e => { if (e.tag === 'golf-outbox') e.waitUntil(replay()); });
+self.addEventListener('message', e => { if (e.data === 'replay') e.waitUntil(replay()); });
+
 self.addEventListener('fetch', e => {
-  if (e.request.url.includes('/api/')) return;
-  // Network-first for navigation (main page) so updates are instant
+  if (e.request.url.includes('/api/')) {
+    if (e.request.method !== 'GET') e.respondWith(write(e.request));
+    return;
+  }
+  // Pages: answer from cache at once and refresh it in the background. A new
+  // build ships a new sw.js (CORE names the hashed bundles), which precaches
+  // the new shell, so the launch after an update picks it up.
   if (e.request.mode === 'navigate') {
-    e.respondWith(
-      fetch(e.request).then(resp => {
-        if (resp.ok) caches.open(CACHE).then(c => c.put(e.request, resp.clone()));
-        return resp;
-      }).catch(() => caches.match(e.request))
-    );
+    const net = fetch(e.request).then(resp => {
+      if (resp.ok) caches.open(CACHE).then(c => c.put(e.request, resp.clone()));
+      return resp;
+    });
+    e.waitUntil(net.catch(() => {}));
+    e.respondWith(caches.match(e.request, {ignoreVary: true}).then(r => r || net));
     return;
   }
-  // Cache-first for static assets (icon, manifest)
+  // Cache-first for static assets (hashed bundles, Chart.js, icon, manifest)
   e.respondWith(
     caches.match(e.request).then(r => r || fetch(e.request).then(resp => {
       if (resp.ok) caches.open(CACHE).then(c => c.put(e.request, resp.clone()));
@@ -263,7 +1269,6 @@ PWA_HTML = r"""<!DOCTYPE html>
 <title>Golf Log</title>
 <link rel="apple-touch-icon" sizes="180x180" href="/icon.png">
 <link rel="manifest" href="/manifest.json">
-<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.2/dist/chart.umd.min.js"></script>
 <style>
 *{box-sizing:border-box;margin:0;padding:0;-webkit-tap-highlight-color:transparent}
 :root{--green:#22c55e;--red:#ef4444;--blue:#60a5fa;--gold:#f59e0b;--saffron:#FF9933;--bg:#111827;--card:#1f2937;--border:#374151;--text:#f9fafb;--muted:#9ca3af}
@@ -790,6 +1795,8 @@ let _charts = {};
 let _historyRounds = [];
 let _editRoundId = null;
 let _historyMatches = [];
+let _bootHistory = null;   // rounds/matches from /api/bootstrap, used by the first loadHistory
+const HISTORY_N = 30;      // rows of each the History tab shows
 let _editMatchIdx = null;
 let _editMatchWinner = 'D';
 
@@ -1152,12 +2159,15 @@ function recordHole() {
       vd:{vGross:R.curV,dGross:R.curD,vStroke:strokes.v,dStroke:strokes.d,
           vNet:calc.vNet,dNet:calc.dNet,honor}
     });
+    livePush(idx);
+    draftPush(idx);
     showOverlay(hole,calc);
   } else {
     const adjMe=adjHoleScore(R.curMe,hole.par,hole.handicap,R.course_hdcp);
     R.results.push({holeNumber:hole.number,par:hole.par,handicap:hole.handicap,
       gross:R.curMe,adj:adjMe,strokes_received:0,vd:null});
     saveState();
+    draftPush(idx);
     if (R.results.length >= R.holes.length) { closeHoleScreen(); showSummary(); }
     else showHole(R.results.length);
     return;
@@ -1382,6 +2392,7 @@ function showSummary() {
   // Projected index
   let projIdx='—';
   if (diff!=='—'&&HDCP&&HDCP.series) {
+    // the last 19 rounds arrive as-is even in a downsampled series
     const d20=HDCP.series.slice(-19).map(r=>r.differential);
     d20.push(parseFloat(diff));
     if (d20.length>=8) {
@@ -1457,7 +2468,8 @@ async function saveRound(auto=false) {
     const nines = R.selectedNines.map(i=>GOV_NINES[i].name);
     vd_match = {
       date:R.date, winner, margin:Math.abs(m),
-      honor_next, nines, historical:false
+      honor_next, nines, historical:false,
+      start_offset:R.startOffset||0, initial_honor:R.initialHonor
     };
   }
 
@@ -1474,13 +2486,28 @@ async function saveRound(auto=false) {
     document.getElementById('save-round-btn').disabled=true;
   }
   try {
-    await fetch('/api/rounds',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(body)});
+    // finish the server-side draft if every hole reached it; otherwise post the whole round
+    await _draftChain;
+    let resp = null;
+    if (R.draftId) {
+      // the whole round rides along, so the server can still save it if the
+      // draft went missing by the time a queued finalize is replayed
+      resp = await fetch(`/api/rounds/draft/${R.draftId}/finalize`,{method:'POST',
+        headers:{'Content-Type':'application/json','Idempotency-Key':'final-'+roundKey()},
+        body:JSON.stringify({...body, holes:R.results.length, round_key:roundKey()})})
+        .catch(()=>null);
+      if (resp && !resp.ok) resp=null;
+    }
+    if (!resp) resp = await fetch('/api/rounds',{method:'POST',
+      headers:{'Content-Type':'application/json','Idempotency-Key':roundKey()},body:JSON.stringify(body)});
+    const queued = resp.status===202;
+    liveEnd();
     R.saved=true; saveState();
-    HDCP=null;
+    HDCP=null; _bootHistory=null;
     if (auto) {
-      showToast('Round auto-saved ✓');
+      showToast(queued ? 'Offline — round will sync ✓' : 'Round auto-saved ✓');
     } else {
-      showToast('Round saved!');
+      showToast(queued ? 'Offline — round will sync' : 'Round saved!');
       R=freshR(); R.saved=true; saveState();
       document.getElementById('screen-summary').classList.remove('open');
       initScoreTab();
@@ -1492,6 +2519,57 @@ async function saveRound(auto=false) {
   }
 }
 
+// one key per round, so a retried or replayed save can't post it twice
+function roundKey() {
+  if (!R.key) { R.key=Date.now().toString(36)+Math.random().toString(36).slice(2); saveState(); }
+  return R.key;
+}
+
+// Draft round: each hole is stored on the server as it's played, so a phone
+// that dies on the back nine doesn't take the round with it. Requests are
+// chained so holes arrive in order; any failure just leaves the final save
+// to post the whole round.
+let _draftChain = Promise.resolve();
+function draftPush(idx) {
+  const r = R.results[idx];
+  _draftChain = _draftChain.then(async () => {
+    if (!R.draftId && idx===0) {
+      const resp = await fetch('/api/rounds/draft',{method:'POST',
+        headers:{'Content-Type':'application/json','Idempotency-Key':'draft-'+roundKey()},
+        body:JSON.stringify({date:R.date, course_id:R.course_id, course_name:R.course_name,
+          rating:R.rating, slope:R.slope, par:R.par, course_hdcp:R.course_hdcp,
+          nine_hole:R.nine_hole, vd_enabled:R.vd_enabled,
+          nines:R.selectedNines.map(i=>GOV_NINES[i].name),
+          start_offset:R.startOffset||0, initial_honor:R.initialHonor, round_key:roundKey()})});
+      const j = resp.status===200 ? await resp.json() : {};
+      if (j.draft_id) { R.draftId=j.draft_id; saveState(); }
+    }
+    if (R.draftId) await fetch(`/api/rounds/draft/${R.draftId}`,{method:'PATCH',
+      headers:{'Content-Type':'application/json'},body:JSON.stringify({idx,...r})});
+  }).catch(()=>{});
+}
+
+// Live match: each VD hole goes to /api/live so spectators on /history can follow
+let _liveStart = null;
+function livePush(idx) {
+  const r = R.results[idx];
+  if (!r || !r.vd) return;
+  if (!R.liveId && !_liveStart) {
+    _liveStart = fetch('/api/live',{method:'POST',headers:{'Content-Type':'application/json'},
+      body:JSON.stringify({date:R.date, nines:R.selectedNines.map(i=>GOV_NINES[i].name),
+        start_offset:R.startOffset||0, initial_honor:R.initialHonor})})
+      .then(x=>x.json()).then(j=>{ if (j.id) { R.liveId=j.id; saveState(); } })
+      .catch(()=>{}).finally(()=>{ _liveStart=null; });
+  }
+  Promise.resolve(_liveStart).then(()=>{
+    if (R.liveId) fetch(`/api/live/${R.liveId}/holes`,{method:'POST',
+      headers:{'Content-Type':'application/json'},body:JSON.stringify({idx,...r})}).catch(()=>{});
+  });
+}
+function liveEnd() {
+  if (R.liveId) fetch(`/api/live/${R.liveId}`,{method:'DELETE'}).catch(()=>{});
+}
+
 function getHonorNext() {
   for (let i=R.results.length-1;i>=0;i--) {
     const r=R.results[i]; if (!r.vd) continue;
@@ -1509,6 +2587,7 @@ function newRound() {
 
 function discardRound() {
   if (!confirm('Discard this round? It will not be saved.')) return;
+  if (R.draftId) fetch(`/api/rounds/draft/${R.draftId}`,{method:'DELETE'}).catch(()=>{});
   R=freshR(); saveState();
   document.getElementById('screen-summary').classList.remove('open');
   initScoreTab();
@@ -1559,7 +2638,7 @@ async function deleteRoundFromEdit() {
 
 // ── Edit / Delete VD matches ─────────────────────────────────
 function editMatch(idx) {
-  const m = _historyMatches[idx];
+  const m = _historyMatches.find(x=>x.idx===idx);
   if (!m) return;
   _editMatchIdx = idx;
   _editMatchWinner = m.winner || 'D';
@@ -1633,11 +2712,30 @@ async function deleteMatchFromEdit() {
 async function loadHandicap() {
   if (HDCP) { renderHandicap(HDCP); return; }
   try {
-    HDCP = await fetch('/api/handicap').then(r=>r.json());
+    HDCP = await fetch('/api/handicap?points=200').then(r=>r.json());
     renderHandicap(HDCP);
   } catch(e) { showToast('Could not load handicap data'); }
 }
 
+// Chart.js loads the first time a chart is drawn: our own copy when the
+// server has a verified one, else the CDN (CORS, so the SW can cache it)
+const CHART_JS = __CHART_JS__;   // [[src, integrity], ...] in order of preference
+let _chartJs = null;
+function loadChartJs() {
+  return _chartJs = _chartJs || new Promise((resolve, reject) => {
+    const next = i => {
+      if (i >= CHART_JS.length) { _chartJs = null; reject(); return; }
+      const s = document.createElement('script');
+      s.src = CHART_JS[i][0]; s.crossOrigin = 'anonymous';
+      if (CHART_JS[i][1]) s.integrity = CHART_JS[i][1];
+      s.onload = resolve;
+      s.onerror = () => { s.remove(); next(i + 1); };
+      document.head.appendChild(s);
+    };
+    next(0);
+  });
+}
+
 function renderHandicap(data) {
   const fmt = v => v !== null && v !== undefined ? v : '—';
   document.getElementById('hcp-index').textContent  = fmt(data.index);
@@ -1683,18 +2781,17 @@ function renderHandicap(data) {
     } else { ptWrap.style.display='none'; }
   } else { bi.style.display='none'; }
 
+  if (!window.Chart) { loadChartJs().then(()=>renderHandicap(data), ()=>{}); return; }
+
   const series = data.series||[];
   const YEAR_COLORS = {'2023':'rgba(96,165,250,.7)','2024':'rgba(34,197,94,.7)','2025':'rgba(245,158,11,.7)','2026':'rgba(239,68,68,.7)'};
   const defaultColor = 'rgba(156,163,175,.6)';
 
-  function mkDate(s) {
-    const p=s.split('/'); if(p.length===3&&p[0].length<=2) return `${p[2].length===2?'20'+p[2]:p[2]}-${p[0].padStart(2,'0')}-${p[1].padStart(2,'0')}`;
-    return s;
-  }
-  const labels=series.map(r=>mkDate(r.date));
+  // Dates arrive as ISO YYYY-MM-DD (normalized server-side at ingest)
+  const labels=series.map(r=>r.date);
   const diffs=series.map(r=>r.differential);
   const indices=series.map(r=>r.index_after);
-  const ptColors=series.map(r=>{const y=mkDate(r.date).slice(0,4);return YEAR_COLORS[y]||defaultColor;});
+  const ptColors=series.map(r=>YEAR_COLORS[r.date.slice(0,4)]||defaultColor);
 
   function destroyChart(id) { if(_charts[id]){_charts[id].destroy();delete _charts[id];} }
   const SCALE_OPTS = {
@@ -1729,7 +2826,7 @@ function renderHandicap(data) {
   const gs=data.ghin_series||[];
   _charts['ghin'] = new Chart(document.getElementById('chart-ghin'),{
     type:'line',
-    data:{labels:gs.map(r=>mkDate(r.date)),datasets:[{data:gs.map(r=>r.ghin),
+    data:{labels:gs.map(r=>r.date),datasets:[{data:gs.map(r=>r.ghin),
       borderColor:'#f59e0b',backgroundColor:'rgba(245,158,11,.08)',
       borderWidth:2,pointRadius:3,stepped:true,fill:true}]},
     options:{responsive:true,maintainAspectRatio:false,plugins:PLUGIN_OPTS,scales:SCALE_OPTS}
@@ -1753,10 +2850,12 @@ async function loadHistory() {
   const body=document.getElementById('history-body');
   body.innerHTML='<div style="color:var(--muted);text-align:center;padding:40px">Loading…</div>';
   try {
-    const [matches,rounds]=await Promise.all([
-      fetch('/api/matches').then(r=>r.json()),
-      fetch('/api/rounds').then(r=>r.json()),
-    ]);
+    // the launch payload the first time; after that just the two pages it shows
+    const {matches,rounds} = _bootHistory || await Promise.all([
+      fetch(`/api/standings?limit=${HISTORY_N}`).then(r=>r.json()),
+      fetch(`/api/rounds?order=desc&limit=${HISTORY_N}&fields=-hole_results`).then(r=>r.json()),
+    ]).then(([vd, rounds])=>({matches:vd.matches, rounds}));
+    _bootHistory = null;
     _historyRounds = rounds;
     _historyMatches = matches;
     renderHistory(matches, rounds);
@@ -1767,13 +2866,10 @@ function renderHistory(matches, rounds) {
   const body=document.getElementById('history-body');
   let html='';
 
-  // VD match results table
+  // VD match results table (running standing computed server-side)
   if (matches.length) {
-    let running=0;
-    const rows=[...matches].reverse().map((m,ri)=>{
-      const origIdx=matches.length-1-ri;
-      if (m.historical) running=m.winner==='D'?m.margin:m.winner==='V'?-m.margin:0;
-      else running+=m.winner==='D'?m.margin:m.winner==='V'?-m.margin:0;
+    const rows=[...matches].reverse().map(m=>{
+      const running=m.standing;
       const winColor=m.winner==='D'?'var(--green)':m.winner==='V'?'var(--saffron)':'var(--muted)';
       const totStr=running>0?`D +${running}`:running<0?`V +${Math.abs(running)}`:'Even';
       const totColor=running>0?'var(--green)':running<0?'var(--saffron)':'var(--muted)';
@@ -1782,7 +2878,7 @@ function renderHistory(matches, rounds) {
         <td style="color:var(--muted)">${m.date||'—'}</td>
         <td style="color:${winColor};font-weight:700">${result}</td>
         <td style="color:${totColor};font-weight:700">${totStr}</td>
-        <td><button onclick="editMatch(${origIdx})" style="background:none;border:none;color:var(--muted);font-size:15px;cursor:pointer;padding:2px 4px">✏️</button></td>
+        <td><button onclick="editMatch(${m.idx})" style="background:none;border:none;color:var(--muted);font-size:15px;cursor:pointer;padding:2px 4px">✏️</button></td>
       </tr>`;
     });
     html+=`<div class="card">
@@ -1798,8 +2894,8 @@ function renderHistory(matches, rounds) {
     </div></div>`;
   }
 
-  // Recent rounds
-  const recent=[...rounds].reverse().slice(0,30);
+  // Recent rounds (already newest-first)
+  const recent=rounds;
   if (recent.length) {
     html+=`<div class="card"><h3>Recent Rounds</h3><div style="overflow-x:auto">
       <table class="htbl" style="font-size:12px">
@@ -1888,12 +2984,20 @@ async function boot() {
   // Register SW
   if ('serviceWorker' in navigator)
     navigator.serviceWorker.register('/sw.js').catch(()=>{});
+  // browsers without Background Sync: nudge the SW to flush its outbox
+  window.addEventListener('online', ()=>{
+    if (navigator.serviceWorker && navigator.serviceWorker.controller)
+      navigator.serviceWorker.controller.postMessage('replay');
+  });
+  if (navigator.serviceWorker)
+    navigator.serviceWorker.addEventListener('message', e=>{
+      if (e.data && e.data.type==='outbox-dead') showToast('A saved change could not be synced and was set aside');
+    });
 
-  // Load courses + handicap data in parallel
+  // Courses, handicap and recent history in one round trip
   try {
-    [COURSES] = await Promise.all([
-      fetch('/api/courses').then(r=>r.json()),
-    ]);
+    const b = await fetch(`/api/bootstrap?n=${HISTORY_N}`).then(r=>r.json());
+    COURSES = b.courses; HDCP = b.handicap; _bootHistory = b;
   } catch(e) {}
 
   // Populate other course dropdown
@@ -1902,9 +3006,6 @@ async function boot() {
     const o=document.createElement('option'); o.value=c.id; o.textContent=c.name; sel.appendChild(o);
   });
 
-  // Prefetch handicap silently
-  fetch('/api/handicap').then(r=>r.json()).then(d=>{ HDCP=d; }).catch(()=>{});
-
   initScoreTab();
 
   // If a completed round is in localStorage but wasn't saved, re-show the summary
@@ -1927,7 +3028,6 @@ HISTORY_HTML = """<!DOCTYPE html>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width,initial-scale=1">
 <title>Golf Log — History</title>
-<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.2/dist/chart.umd.min.js"></script>
 <style>
 *{box-sizing:border-box;margin:0;padding:0}
 body{font-family:-apple-system,sans-serif;background:#111827;color:#f9fafb;min-height:100vh}
@@ -1961,42 +3061,71 @@ canvas{display:block}
   <a href="/">← Scoring App</a>
 </div>
 <div class="wrap">
+  <div id="live" style="display:none"></div>
   <div id="content"><p style="color:#9ca3af;text-align:center;padding:60px">Loading…</p></div>
 </div>
 <script>
-fetch('/api/matches').then(r=>r.json()).then(render).catch(()=>{
-  document.getElementById('content').innerHTML='<p style="color:#ef4444;text-align:center;padding:60px">Could not load match data</p>';
-});
+// Chart.js loads the first time a chart is drawn: our own copy when the
+// server has a verified one, else the CDN (CORS, so the SW can cache it)
+const CHART_JS = __CHART_JS__;   // [[src, integrity], ...] in order of preference
+let _chartJs = null;
+function loadChartJs() {
+  return _chartJs = _chartJs || new Promise((resolve, reject) => {
+    const next = i => {
+      if (i >= CHART_JS.length) { _chartJs = null; reject(); return; }
+      const s = document.createElement('script');
+      s.src = CHART_JS[i][0]; s.crossOrigin = 'anonymous';
+      if (CHART_JS[i][1]) s.integrity = CHART_JS[i][1];
+      s.onload = resolve;
+      s.onerror = () => { s.remove(); next(i + 1); };
+      document.head.appendChild(s);
+    };
+    next(0);
+  });
+}
 
-function sma(arr, n, i) {
-  if (i < n-1) return null;
-  let s=0; for(let j=i-n+1;j<=i;j++) s+=arr[j]; return s/n;
+// Live matches over SSE: a full 'state' on connect, then per-hole deltas
+const LIVE = {};
+function renderLive() {
+  const el = document.getElementById('live');
+  const ms = Object.values(LIVE);
+  el.style.display = ms.length ? 'block' : 'none';
+  el.innerHTML = ms.map(m => {
+    const lead = m.leader==='T' ? 'All square' : `${m.leader} +${Math.abs(m.margin)}`;
+    return `<div class="card" style="border-color:#ef4444"><b style="color:#ef4444">● LIVE</b> ${m.date||''} ${(m.nines||[]).join(' / ')}
+      <div style="font-size:22px;font-weight:700;margin:6px 0">${lead} <span class="dim" style="font-size:13px">thru ${m.thru}</span></div>
+      <div class="dim">Net V ${m.v_net} · D ${m.d_net} · honor ${m.honor}</div></div>`;
+  }).join('');
 }
+if (window.EventSource) {
+  const es = new EventSource('/api/live/stream');
+  es.addEventListener('state', e => {
+    for (const k in LIVE) delete LIVE[k];
+    JSON.parse(e.data).matches.forEach(m => LIVE[m.id] = m);
+    renderLive();
+  });
+  es.addEventListener('start', e => { const m = JSON.parse(e.data); LIVE[m.id] = m; renderLive(); });
+  es.addEventListener('hole', e => { const d = JSON.parse(e.data); LIVE[d.id] = {...LIVE[d.id], ...d}; renderLive(); });
+  es.addEventListener('end', e => {
+    delete LIVE[JSON.parse(e.data).id]; renderLive();
+    fetch('/api/standings').then(r=>r.json()).then(render).catch(()=>{});
+  });
+}
+
+fetch('/api/standings').then(r=>r.json()).then(render).catch(()=>{
+  document.getElementById('content').innerHTML='<p style="color:#ef4444;text-align:center;padding:60px">Could not load match data</p>';
+});
 
-function render(matches) {
+function render(data) {
+  const matches = data.matches;
   if (!matches.length) {
     document.getElementById('content').innerHTML='<p style="color:#9ca3af;text-align:center;padding:60px">No matches yet — play some golf!</p>';
     return;
   }
 
-  let runningTotal = 0;
-  const standings = matches.map(m => {
-    if (m.historical) {
-      runningTotal = m.winner==='D' ? m.margin : m.winner==='V' ? -m.margin : 0;
-    } else {
-      runningTotal += m.winner==='D' ? m.margin : m.winner==='V' ? -m.margin : 0;
-    }
-    return runningTotal;
-  });
-
-  let vW=0, dW=0, ties=0;
-  for (let i=0; i<standings.length; i++) {
-    const prev = i===0 ? 0 : standings[i-1];
-    const delta = standings[i] - prev;
-    if (delta > 0) dW++; else if (delta < 0) vW++; else ties++;
-  }
-
-  const sma5 = standings.map((_,i) => sma(standings,5,i));
+  // Running standings and 5-SMA come precomputed from /api/standings
+  const standings = matches.map(m => m.standing);
+  const sma5 = matches.map(m => m.sma5);
   const chartLabels = matches.map((m,i) => m.date.startsWith('pre-2025') ? '#'+(i+1) : m.date);
 
   const cur = standings[standings.length-1];
@@ -2055,6 +3184,8 @@ function render(matches) {
     v > 0 ? 'rgba(96,165,250,.7)' : v < 0 ? 'rgba(34,197,94,.7)' : 'rgba(156,163,175,.5)'
   );
 
+  if (!window.Chart) { loadChartJs().then(()=>render(data), ()=>{}); return; }
+
   new Chart(document.getElementById('chart'), {
     type: 'bar',
     data: {
@@ -2113,39 +3244,366 @@ function render(matches) {
 </html>"""
 
 
+# ---------------------------------------------------------------------------
+# Response compression — static bodies are compressed once at startup, large
+# dynamic JSON on the fly.
+# ---------------------------------------------------------------------------
+COMPRESS_MIN   = 1024   # bytes; smaller bodies go out as-is
+COMPRESSIBLE   = ('text/', 'application/json', 'application/javascript',
+                  'application/manifest+json')
+ENCODINGS      = ('br', 'gzip') if brotli else ('gzip',)   # server preference order
+
+def compress(data, enc, fast=False):
+    if enc == 'br':
+        return brotli.compress(data, quality=5 if fast else 11)
+    return gzip.compress(data, compresslevel=6 if fast else 9, mtime=0)
+
+def pick_encoding(accept, available):
+    """Best encoding from an Accept-Encoding header among `available`, else 'identity'."""
+    q = {}
+    for part in (accept or '').split(','):
+        name, _, params = part.strip().partition(';')
+        m = re.search(r'q=([0-9.]+)', params)
+        q[name.strip().lower()] = float(m.group(1)) if m else 1.0
+    for enc in ENCODINGS:
+        if enc in available and q.get(enc, q.get('*', 0)) > 0:
+            return enc
+    return 'identity'
+
+
+class Precompressed:
+    """A response body with its content-hash ETag and gzip/brotli variants built up front."""
+    def __init__(self, body, fast=False, compressible=True):
+        data = body.encode() if isinstance(body, str) else body
+        self.etag     = make_etag(data)
+        self.variants = {'identity': data}
+        if compressible and len(data) >= COMPRESS_MIN:
+            for enc in ENCODINGS:
+                self.variants[enc] = compress(data, enc, fast)
+
+
+# ---------------------------------------------------------------------------
+# App bundles — PWA_HTML's inline <style> and <script> are served as
+# content-hashed /app.<hash>.css and /app.<hash>.js, leaving a small shell.
+# A changed bundle gets a new URL, so the bundles can be cached as immutable.
+# ---------------------------------------------------------------------------
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Chart.js is served from our own origin, under a versioned URL the service
+# worker can cache, when chart.umd.min.js next to server.py matches the pinned
+# CHART_JS_SHA256. `python3 server.py --vendor-chartjs` fetches and checks it;
+# requests never touch the network. Without a verified copy the pages load
+# CHART_JS_CDN, with the pin as its integrity hash.
+CHART_JS_VERSION = '4.4.2'
+CHART_JS_SHA256  = os.environ.get('CHART_JS_SHA256', '')   # hex digest of chart.umd.min.js
+CHART_JS_CDN  = f'https://cdn.jsdelivr.net/npm/chart.js@{CHART_JS_VERSION}/dist/chart.umd.min.js'
+CHART_JS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chart.umd.min.js')
+CHART_JS_URL  = f'/chart-{CHART_JS_VERSION}.js'
+
+def split_bundles(html):
+    """(shell, css, js, css_url, js_url) from a page with one inline <style> and <script>."""
+    css = re.search(r'<style>\n(.*?)</style>\n', html, re.S)
+    js  = re.search(r'<script>\n(.*?)</script>\n', html, re.S)
+    css_url = f'/app.{hashlib.sha1(css.group(1).encode()).hexdigest()[:10]}.css'
+    js_url  = f'/app.{hashlib.sha1(js.group(1).encode()).hexdigest()[:10]}.js'
+    shell = (html[:css.start()] + f'<link rel="stylesheet" href="{css_url}">\n'
+             + html[css.end():js.start()] + f'<script src="{js_url}"></script>\n' + html[js.end():])
+    return shell, css.group(1), js.group(1), css_url, js_url
+
+def load_chart_js():
+    """Precompressed CHART_JS_FILE if it matches CHART_JS_SHA256, else None."""
+    try:
+        with open(CHART_JS_FILE, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if hashlib.sha256(data).hexdigest() != CHART_JS_SHA256.lower():
+        print(f'{CHART_JS_FILE} does not match CHART_JS_SHA256; charts load from the CDN')
+        return None
+    return Precompressed(data)
+
+def vendor_chart_js():
+    """Fetch CHART_JS_CDN into CHART_JS_FILE, only if it matches CHART_JS_SHA256."""
+    try:
+        with urllib.request.urlopen(CHART_JS_CDN, timeout=30) as resp:
+            data = resp.read()
+    except OSError as e:
+        print(f'Could not fetch {CHART_JS_CDN}: {e}')
+        return False
+    digest = hashlib.sha256(data).hexdigest()
+    if not CHART_JS_SHA256:
+        print(f'Fetched {len(data)} bytes with sha256 {digest}. Check that against the '
+              f'published hash, then set CHART_JS_SHA256 and run this again.')
+        return False
+    if digest != CHART_JS_SHA256.lower():
+        print(f'sha256 {digest} does not match CHART_JS_SHA256; not written')
+        return False
+    with open(CHART_JS_FILE + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(CHART_JS_FILE + '.tmp', CHART_JS_FILE)
+    print(f'Wrote {CHART_JS_FILE}')
+    return True
+
+CHART_JS_BODY = load_chart_js()
+CHART_JS_SRI  = ('sha256-' + base64.b64encode(bytes.fromhex(CHART_JS_SHA256)).decode()
+                 if CHART_JS_SHA256 else '')
+CHART_JS_SRCS = json.dumps(([[CHART_JS_URL, CHART_JS_SRI]] if CHART_JS_BODY else [])
+                           + [[CHART_JS_CDN, CHART_JS_SRI]])
+
+SHELL_HTML, APP_CSS, APP_JS, APP_CSS_URL, APP_JS_URL = split_bundles(
+    PWA_HTML.replace('__CHART_JS__', CHART_JS_SRCS))
+SW_CORE = ['/', APP_CSS_URL, APP_JS_URL, '/icon.png', '/manifest.json']
+if CHART_JS_BODY:
+    SW_CORE.append(CHART_JS_URL)
+SW_JS = (SW_JS.replace('__BUILD__', hashlib.sha1((SHELL_HTML + APP_CSS + APP_JS).encode()).hexdigest()[:10])
+              .replace('__CORE__', json.dumps(SW_CORE)))
+
+PWA_BODY      = Precompressed(SHELL_HTML)
+APP_CSS_BODY  = Precompressed(APP_CSS)
+APP_JS_BODY   = Precompressed(APP_JS)
+HISTORY_BODY  = Precompressed(HISTORY_HTML.replace('__CHART_JS__', CHART_JS_SRCS))
+SW_BODY       = Precompressed(SW_JS)
+MANIFEST_BODY = Precompressed(MANIFEST_JSON)
+ICON_BODY     = Precompressed(ICON_PNG, compressible=False)
+
+# route → (content type, body, Cache-Control). Pages and the service worker
+# revalidate every time (a 304 is one round trip with no body); the hashed
+# bundles never change under their URL; the icon and manifest rarely change,
+# so browsers may reuse them for a while.
+STATIC_ROUTES = {
+    '/':              ('text/html', PWA_BODY, 'no-cache'),
+    '/index.html':    ('text/html', PWA_BODY, 'no-cache'),
+    APP_CSS_URL:      ('text/css', APP_CSS_BODY, IMMUTABLE),
+    APP_JS_URL:       ('application/javascript', APP_JS_BODY, IMMUTABLE),
+    '/history':       ('text/html', HISTORY_BODY, 'no-cache'),
+    '/sw.js':         ('application/javascript', SW_BODY, 'no-cache'),
+    '/manifest.json': ('application/manifest+json', MANIFEST_BODY, 'public, max-age=86400'),
+    '/icon.png':      ('image/png', ICON_BODY, 'public, max-age=604800'),
+}
+
+
+# ---------------------------------------------------------------------------
+# Idempotency — writes replayed from the service worker's offline outbox carry
+# an Idempotency-Key. Created rounds/matches store the key, so a replay never
+# adds them twice; the last IDEMPOTENCY_MAX responses are also kept so any
+# replayed write (PATCH, DELETE by index) gets its original answer back.
+# ---------------------------------------------------------------------------
+IDEMPOTENCY_MAX = 1000
+# POSTs whose records keep the key for dedupe; anything else just gets the replay cache
+KEYED_WRITES    = re.compile(r'^/api/(rounds|matches|match|rounds/draft(/[\w-]+/finalize)?)$')
+_idem_lock      = threading.Lock()
+_idem_responses = OrderedDict()
+
+def idem_response(key):
+    with _idem_lock:
+        resp = _idem_responses.get(key)
+        if resp:
+            _idem_responses.move_to_end(key)
+        return resp
+
+def idem_remember(key, resp):
+    with _idem_lock:
+        _idem_responses[key] = resp
+        _idem_responses.move_to_end(key)
+        while len(_idem_responses) > IDEMPOTENCY_MAX:
+            _idem_responses.popitem(last=False)
+
+
 # ---------------------------------------------------------------------------
 # Server
 # ---------------------------------------------------------------------------
+def answers_errors(method):
+    """Answer a handler that raises with 400 (bad body) or 500, never a dropped connection.
+
+    A dropped connection reads as "offline" to the service worker, which would
+    keep the write at the head of its outbox and retry it forever.
+    """
+    @functools.wraps(method)
+    def run(self):
+        self._answered = False
+        try:
+            method(self)
+        except Exception as e:
+            self.log_error('%s %s failed:\n%s', self.command, self.path, traceback.format_exc())
+            if self._answered:
+                self.close_connection = True
+                return
+            if isinstance(e, ValueError):      # includes malformed JSON
+                self._send(400, 'text/plain', f'Bad request: {e}')
+            else:
+                self._send(500, 'text/plain', f'Server error: {type(e).__name__}')
+            self.close_connection = True       # the body may not have been read
+    return run
+
 class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the PWA's burst of API calls on one connection, so every
+    # response must carry Content-Length. Between requests the connection waits
+    # in PooledHTTPServer's selector, not here; `timeout` only bounds a client
+    # that stalls mid-request.
+    protocol_version = 'HTTP/1.1'
+    timeout          = REQUEST_TIMEOUT
+    _idem_key        = None   # Idempotency-Key of the write being answered
+    _answered        = False  # whether a status line has gone out for this request
+
+    def handle(self):
+        # one request, plus any the client already sent behind it; an idle
+        # connection goes back to the server rather than holding this thread
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._buffered():
+            self.handle_one_request()
+
+    def _buffered(self):
+        """Whether more request bytes are already here, checked without blocking."""
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    @answers_errors
     def do_GET(self):
-        if self.path in ('/', '/index.html'):
-            self._send(200, 'text/html', PWA_HTML)
-        elif self.path == '/sw.js':
-            self._send(200, 'application/javascript', SW_JS)
-        elif self.path == '/icon.png':
-            self._send(200, 'image/png', ICON_PNG)
-        elif self.path == '/manifest.json':
-            self._send(200, 'application/manifest+json', MANIFEST_JSON)
-        elif self.path == '/history':
-            self._send(200, 'text/html', HISTORY_HTML)
-        elif self.path == '/api/matches':
-            self._send(200, 'application/json', json.dumps(load_matches()))
-        elif self.path == '/api/rounds':
-            self._send(200, 'application/json', json.dumps(load_rounds()))
-        elif self.path == '/api/courses':
+        u = urlsplit(self.path)
+        route, q = u.path, dict(parse_qsl(u.query))
+        if route in STATIC_ROUTES:
+            self._send_cached(*STATIC_ROUTES[route])
+        elif route == CHART_JS_URL and CHART_JS_BODY:
+            self._send_cached('application/javascript', CHART_JS_BODY, IMMUTABLE)
+        elif route == '/api/matches':
+            self._send_records(MATCHES, q)
+        elif route == '/api/rounds':
+            self._send_records(ROUNDS, q, key='id')
+        elif route == '/api/rounds/drafts':
+            self._send(200, 'application/json', json.dumps(DRAFTS.get()))
+        elif route == '/api/courses':
             self._send(200, 'application/json', json.dumps(load_courses()))
-        elif self.path == '/api/handicap':
-            self._send(200, 'application/json', json.dumps(get_handicap_data()))
+        elif route == '/api/handicap':
+            try:
+                points = int(q['points']) if 'points' in q else None
+                if points is not None and points < 3:
+                    raise ValueError
+            except ValueError:
+                self._send(400, 'text/plain', 'Bad query: points must be an integer >= 3')
+                return
+            body = handicap_payload(points, q.get('envelope') in ('1', 'true'))
+            self._send_cached('application/json', body, 'no-cache')
+        elif route == '/api/standings':
+            try:
+                limit = int(q['limit']) if 'limit' in q else None
+            except ValueError:
+                self._send(400, 'text/plain', 'Bad query: limit must be an integer')
+                return
+            self._send(200, 'application/json',
+                       json.dumps(standings_data(None if limit is None else max(limit, 0))))
+        elif route == '/api/handicap/analytics':
+            try:
+                sma_n  = int(q.get('sma', 5))
+                whatif = [float(x) for x in q['whatif'].split(',') if x] if q.get('whatif') else []
+                if sma_n < 1:
+                    raise ValueError
+            except ValueError:
+                self._send(400, 'text/plain', 'Bad query: sma must be a positive integer, whatif a list of numbers')
+                return
+            self._send(200, 'application/json', json.dumps(handicap_analytics(sma_n, whatif)))
+        elif route == '/api/live':
+            self._send(200, 'application/json', json.dumps(LIVE.snapshot(q.get('id'))))
+        elif route == '/api/live/stream':
+            self._stream_live(q.get('id'))
+        elif route == '/api/holes/stats':
+            try:
+                hole = int(q['hole']) if 'hole' in q else None
+            except ValueError:
+                self._send(400, 'text/plain', 'Bad query: hole must be an integer')
+                return
+            data = hole_stats(q.get('course_id'), hole, q.get('group'))
+            self._send(200, 'application/json', json.dumps(data))
+        elif route == '/api/vd/audit':
+            self._send(200, 'application/json', json.dumps(vd_audit()))
+        elif route == '/api/bootstrap':
+            try:
+                n = int(q.get('n', 30))
+            except ValueError:
+                self._send(400, 'text/plain', 'Bad query: n must be an integer')
+                return
+            self._send(200, 'application/json', json.dumps(bootstrap_data(max(n, 0))))
         else:
             self._send(404, 'text/plain', 'Not found')
 
+    @answers_errors
     def do_POST(self):
-        n    = int(self.headers.get('Content-Length', 0))
-        body = json.loads(self.rfile.read(n))
-        if self.path == '/api/rounds':
+        n   = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(n)
+        if self._replayed():
+            return
+        if self.path == '/api/rounds/bulk':
+            try:
+                items = parse_bulk(raw)
+            except ValueError as e:
+                self._send(400, 'text/plain', f'Bad body: {e}')
+                return
+            results = save_rounds(items)
+            self._send(200, 'application/json', json.dumps({
+                'ok': all(r['ok'] for r in results),
+                'inserted': sum(r['ok'] and not r.get('duplicate') for r in results),
+                'results': results}))
+            return
+        body = json.loads(raw)
+        key  = self._idem_key
+        if key and isinstance(body, dict) and KEYED_WRITES.match(self.path):
+            body['idempotency_key'] = key
+            if isinstance(body.get('vd_match'), dict):
+                body['vd_match']['idempotency_key'] = key
+        ml = re.match(r'^/api/live/(\d+)/holes$', self.path)
+        mf = re.match(r'^/api/rounds/draft/([\w-]+)/finalize$', self.path)
+        if mf:
+            try:
+                result = finalize_draft(mf.group(1), body)
+            except LookupError as e:
+                self._send(409, 'text/plain', f'Draft out of step: {e}')
+                return
+            except ValueError as e:
+                self._send(400, 'text/plain', f'Bad draft: {e}')
+                return
+            self._send(200 if result else 404, 'application/json',
+                       json.dumps({'ok': True, 'id': result['id'],
+                                   'differential': result.get('differential')})
+                       if result else '"not found"')
+        elif self.path == '/api/rounds/draft':
+            try:
+                d = start_draft(body)
+            except ValueError as e:
+                self._send(400, 'text/plain', f'Bad draft: {e}')
+                return
+            except LookupError as e:
+                self._send(409, 'text/plain', f'Draft not opened: {e}')
+                return
+            self._send(200, 'application/json', json.dumps({'ok': True, 'draft_id': d['id']}))
+        elif ml:
+            try:
+                score = LIVE.hole(ml.group(1), body)
+            except (ValueError, AttributeError) as e:
+                self._send(400, 'text/plain', f'Bad hole: {e}')
+                return
+            self._send(200 if score else 404, 'application/json',
+                       json.dumps({'ok': True, **score}) if score else '"not found"')
+        elif self.path == '/api/live':
+            try:
+                mid = LIVE.start(body)
+            except ValueError as e:
+                self._send(400, 'text/plain', f'Bad match: {e}')
+                return
+            self._send(200, 'application/json', json.dumps({'ok': True, 'id': mid}))
+        elif self.path == '/api/rounds':
+            err = round_error(body)
+            if err:
+                self._send(400, 'text/plain', f'Bad round: {err}')
+                return
             result = save_round(body)
             if body.get('vd_match'):
                 append_match(body['vd_match'])
+            close_drafts(key)
             self._send(200, 'application/json',
                        json.dumps({'ok': True, 'id': result['id']}))
         elif self.path == '/api/courses':
@@ -2157,12 +3615,24 @@ class Handler(BaseHTTPRequestHandler):
         else:
             self._send(404, 'text/plain', 'Not found')
 
+    @answers_errors
     def do_PATCH(self):
         n = int(self.headers.get('Content-Length', 0))
         body = json.loads(self.rfile.read(n))
+        if self._replayed():
+            return
         mr = re.match(r'^/api/rounds/(\d+)$', self.path)
         mm = re.match(r'^/api/matches/(\d+)$', self.path)
-        if mr:
+        md = re.match(r'^/api/rounds/draft/([\w-]+)$', self.path)
+        if md:
+            try:
+                holes = draft_hole(md.group(1), body)
+            except (ValueError, AttributeError) as e:
+                self._send(400, 'text/plain', f'Bad hole: {e}')
+                return
+            self._send(200 if holes is not None else 404, 'application/json',
+                       json.dumps({'ok': True, 'holes': holes}) if holes is not None else '"not found"')
+        elif mr:
             result = update_round(int(mr.group(1)), body)
             self._send(200 if result else 404, 'application/json',
                        '{"ok":true}' if result else '"not found"')
@@ -2173,10 +3643,23 @@ class Handler(BaseHTTPRequestHandler):
         else:
             self._send(404, 'text/plain', 'Not found')
 
+    @answers_errors
     def do_DELETE(self):
+        if self._replayed():
+            return
         mr = re.match(r'^/api/rounds/(\d+)$', self.path)
         mm = re.match(r'^/api/matches/(\d+)$', self.path)
-        if mr:
+        ml = re.match(r'^/api/live/(\d+)$', self.path)
+        md = re.match(r'^/api/rounds/draft/([\w-]+)$', self.path)
+        if md:
+            ok = discard_draft(md.group(1))
+            self._send(200 if ok else 404, 'application/json',
+                       '{"ok":true}' if ok else '"not found"')
+        elif ml:
+            ok = LIVE.end(ml.group(1))
+            self._send(200 if ok else 404, 'application/json',
+                       '{"ok":true}' if ok else '"not found"')
+        elif mr:
             ok = delete_round(int(mr.group(1)))
             self._send(200 if ok else 404, 'application/json',
                        '{"ok":true}' if ok else '"not found"')
@@ -2191,21 +3674,251 @@ class Handler(BaseHTTPRequestHandler):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, PATCH, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Idempotency-Key')
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
-    def _send(self, code, ctype, body):
+    def _encode(self, ctype, body):
+        """(encoding, bytes) for this request's Accept-Encoding."""
+        accept = self.headers.get('Accept-Encoding')
+        if isinstance(body, Precompressed):
+            enc = pick_encoding(accept, body.variants)
+            return enc, body.variants[enc]
         data = body.encode() if isinstance(body, str) else body
+        if len(data) >= COMPRESS_MIN and ctype.startswith(COMPRESSIBLE):
+            enc = pick_encoding(accept, ENCODINGS)
+            if enc != 'identity':
+                return enc, compress(data, enc, fast=True)
+        return 'identity', data
+
+    @staticmethod
+    def _variant_etag(etag, enc):
+        # a strong ETag must differ per content-coding
+        return etag if enc == 'identity' else etag[:-1] + '-' + enc + '"'
+
+    def _stream_live(self, match_id):
+        """Answer with an SSE stream and hand the socket to the broadcaster,
+        freeing this worker; the server must not close it (see detach)."""
+        if LIVE.bc.full():
+            self._send(503, 'text/plain', 'Too many live subscribers')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.close_connection = True
+        if LIVE.subscribe(self.connection, match_id):
+            self.server.detach(self.connection)
+
+    def _replayed(self):
+        """Re-send the stored answer if this write's Idempotency-Key was seen before."""
+        self._idem_key = self.headers.get('Idempotency-Key')
+        resp = self._idem_key and idem_response(self._idem_key)
+        if resp:
+            self._idem_key = None
+            self._send(*resp, headers={'Idempotent-Replayed': 'true'})
+        return bool(resp)
+
+    def send_response(self, code, message=None):
+        self._answered = True
+        super().send_response(code, message)
+
+    def _send(self, code, ctype, body, headers=None):
+        if self._idem_key:
+            if code < 500:
+                idem_remember(self._idem_key, (code, ctype, body))
+            self._idem_key = None
+        headers = dict(headers or {})
+        enc, data = self._encode(ctype, body)
+        if enc != 'identity':
+            headers['Content-Encoding'] = enc
+        if 'ETag' in headers:
+            headers['ETag'] = self._variant_etag(headers['ETag'], enc)
+        if ctype.startswith(COMPRESSIBLE):
+            headers['Vary'] = 'Accept-Encoding'
         self.send_response(code)
         self.send_header('Content-Type', ctype)
         self.send_header('Content-Length', len(data))
         self.send_header('Access-Control-Allow-Origin', '*')
+        for k, v in headers.items():
+            self.send_header(k, v)
         self.end_headers()
         self.wfile.write(data)
 
+    def _send_records(self, store, q, key=None):
+        if q and isinstance(store, SqliteStore) and store.table == 'rounds':
+            try:
+                items, next_cursor = query_rounds_sql(store.db, q)
+            except ValueError as e:
+                self._send(400, 'text/plain', f'Bad query: {e}')
+                return
+            headers = {'X-Next-Cursor': str(next_cursor)} if next_cursor is not None else {}
+            self._send(200, 'application/json', json.dumps(items), headers)
+            return
+        with store.lock:
+            records = store.get()
+            if not q:
+                self._send(200, 'application/json', json.dumps(records))
+                return
+            try:
+                items, next_cursor = query_records(records, q, key)
+            except ValueError as e:
+                self._send(400, 'text/plain', f'Bad query: {e}')
+                return
+            body = json.dumps(items)
+        headers = {'X-Next-Cursor': str(next_cursor)} if next_cursor is not None else {}
+        self._send(200, 'application/json', body, headers)
+
+    def _send_cached(self, ctype, body, cache_control):
+        """Send a Precompressed body, or a bodiless 304 if If-None-Match still matches."""
+        if not etag_matches(self.headers.get('If-None-Match'), body.etag):
+            self._send(200, ctype, body, {'ETag': body.etag, 'Cache-Control': cache_control})
+            return
+        enc = pick_encoding(self.headers.get('Accept-Encoding'), body.variants)
+        self.send_response(304)
+        self.send_header('ETag', self._variant_etag(body.etag, enc))
+        self.send_header('Cache-Control', cache_control)
+        if ctype.startswith(COMPRESSIBLE):
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
     def log_message(self, *a): pass
 
 
+class StreamingHTTPServer(HTTPServer):
+    """HTTPServer that leaves a connection open once a handler has detached it
+    (handed the socket to a long-lived stream such as /api/live/stream)."""
+    request_queue_size = 64   # listen backlog; the default 5 stalls bursts of connects
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.detached = set()
+
+    def detach(self, request):
+        self.detached.add(request)
+
+    def shutdown_request(self, request):
+        if request in self.detached:
+            self.detached.discard(request)
+            return
+        super().shutdown_request(request)
+
+
+class PooledHTTPServer(StreamingHTTPServer):
+    """HTTPServer that hands each request to a fixed pool of worker threads.
+
+    A connection only gets a worker once it has bytes to read: new and idle
+    keep-alive connections wait in one selector (a file descriptor each, no
+    thread) and are closed after KEEPALIVE_TIMEOUT without a request.
+    Requests beyond WORKERS queue for the next free worker; server_close()
+    waits for in-flight requests.
+    """
+    def __init__(self, addr, handler, workers):
+        super().__init__(addr, handler)
+        self.pool    = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http')
+        self.idle    = selectors.DefaultSelector()
+        self.closing = False
+        self._idle_lock = threading.Lock()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self.idle.register(self._wake_r, selectors.EVENT_READ)
+        threading.Thread(target=self._watch_idle, name='http-idle', daemon=True).start()
+
+    def process_request(self, request, client_address):
+        self.park(request, client_address)
+
+    def park(self, request, client_address):
+        """Wait for the connection's next request without holding a worker."""
+        with self._idle_lock:
+            if not self.closing:
+                self.idle.register(request, selectors.EVENT_READ,
+                                   (client_address, time.monotonic()))
+                self._wake_w.send(b'.')
+                return
+        self.shutdown_request(request)
+
+    def _watch_idle(self):
+        while not self.closing:
+            ready = self.idle.select(timeout=1)
+            with self._idle_lock:
+                if self.closing:
+                    return
+                now, stale = time.monotonic(), []
+                for key, _ in ready:
+                    if key.fileobj is self._wake_r:
+                        self._wake_r.recv(4096)
+                        continue
+                    self.idle.unregister(key.fileobj)
+                    self.pool.submit(self._work, key.fileobj, key.data[0])
+                for key in list(self.idle.get_map().values()):
+                    if key.data and now - key.data[1] > KEEPALIVE_TIMEOUT:
+                        self.idle.unregister(key.fileobj)
+                        stale.append(key.fileobj)
+            for request in stale:
+                self.shutdown_request(request)
+
+    def _work(self, request, client_address):
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        if handler.close_connection:
+            self.shutdown_request(request)
+        else:
+            self.park(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        with self._idle_lock:
+            self.closing = True    # in-flight requests now close their connection when done
+            parked = [k.fileobj for k in self.idle.get_map().values() if k.data]
+            self.idle.close()
+        self.pool.shutdown(wait=True)
+        for request in parked:
+            self.shutdown_request(request)
+        self._wake_r.close()
+        self._wake_w.close()
+
+
+class OneShotHandler(Handler):
+    # single mode has one thread, so a kept-alive connection would block everyone else
+    protocol_version = 'HTTP/1.0'
+
+
+def make_server(port=PORT, mode=SERVER_MODE):
+    if mode == 'single':
+        return StreamingHTTPServer(('', port), OneShotHandler)
+    if mode == 'threaded':
+        return PooledHTTPServer(('', port), Handler, WORKERS)
+    raise ValueError(f"SERVER_MODE must be 'threaded' or 'single', not {mode!r}")
+
+
 if __name__ == '__main__':
-    print(f'Golf Log → http://localhost:{PORT}')
-    HTTPServer(('', PORT), Handler).serve_forever()
+    if sys.argv[1:] == ['--vendor-chartjs']:
+        sys.exit(0 if vendor_chart_js() else 1)
+    if STORAGE == 'sqlite':
+        seed_sqlite()
+    for store in (ROUNDS, COURSES, MATCHES):
+        store.get()
+    migrate_dates()
+    threading.Thread(target=_compactor, daemon=True).start()
+    httpd = make_server()
+
+    # SIGTERM (e.g. a platform restart) and Ctrl-C stop accepting, let
+    # in-flight requests finish, then fold the journals into the snapshots.
+    def _stop(signum, frame):
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    print(f'Golf Log → http://localhost:{PORT} ({SERVER_MODE}, {WORKERS} workers)'
+          if SERVER_MODE == 'threaded' else f'Golf Log → http://localhost:{PORT}')
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+        compact_all()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+SQLite storage backend for Golf Log (stdlib sqlite3, WAL mode).
+Enable with GOLF_STORAGE=sqlite; the database lives next to the JSON files.
+
+Each table keeps the full record as JSON in `data` plus the columns we filter
+and sort on, so records round-trip unchanged.
+
+Convert between the JSON files and the database (server stopped):
+    python3 sqlite_store.py import   # JSON files → golf.db
+    python3 sqlite_store.py export   # golf.db → JSON files
+"""
+import json, os, sqlite3, sys, threading
+
+DB_FILE = os.path.join(os.path.dirname(__file__), 'golf.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO meta (name) VALUES ('rounds'), ('matches'), ('courses');
+
+CREATE TABLE IF NOT EXISTS rounds (
+    id           INTEGER PRIMARY KEY,
+    date         TEXT,
+    course_id    TEXT,
+    include_ghin INTEGER,
+    differential REAL,
+    data         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_date   ON rounds (date, id);
+CREATE INDEX IF NOT EXISTS rounds_course ON rounds (course_id, date);
+CREATE INDEX IF NOT EXISTS rounds_posted ON rounds (date, id)
+    WHERE include_ghin AND differential IS NOT NULL;
+
+-- per-hole queries are served from server.HOLES; drop the old derived table
+DROP TABLE IF EXISTS hole_results;
+
+CREATE TABLE IF NOT EXISTS matches (
+    seq    INTEGER PRIMARY KEY AUTOINCREMENT,
+    date   TEXT,
+    winner TEXT,
+    data   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_date ON matches (date);
+
+CREATE TABLE IF NOT EXISTS courses (
+    seq  INTEGER PRIMARY KEY AUTOINCREMENT,
+    id   TEXT,
+    name TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS courses_id ON courses (id);
+"""
+
+# meta.version bumps on any write to a table, including ones made by another
+# process (e.g. the sqlite3 shell), so cached copies know when to reload.
+for _t in ('rounds', 'matches', 'courses'):
+    for _ev in ('INSERT', 'UPDATE', 'DELETE'):
+        SCHEMA += (f"CREATE TRIGGER IF NOT EXISTS {_t}_{_ev.lower()} AFTER {_ev} ON {_t} "
+                   f"BEGIN UPDATE meta SET version = version + 1 WHERE name = '{_t}'; END;\n")
+
+
+class Database:
+    def __init__(self, path=DB_FILE):
+        self.path   = path
+        self._local = threading.local()
+
+    def conn(self):
+        """Per-thread connection; WAL lets readers run alongside a writer."""
+        c = getattr(self._local, 'conn', None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=10)
+            c.execute('PRAGMA journal_mode=WAL')
+            c.execute('PRAGMA synchronous=NORMAL')
+            c.executescript(SCHEMA)
+            self._local.conn = c
+        return c
+
+    def table_version(self, table):
+        return self.conn().execute(
+            'SELECT version FROM meta WHERE name = ?', (table,)).fetchone()[0]
+
+    # ── rounds ─────────────────────────────────────────────────────────────
+    def rounds(self, where='', params=(), order='id', limit=None, offset=0):
+        sql = f'SELECT data FROM rounds {where} ORDER BY {order}'
+        if limit is not None or offset:
+            sql += f' LIMIT {int(limit) if limit is not None else -1} OFFSET {int(offset)}'
+        return [json.loads(d) for (d,) in self.conn().execute(sql, params)]
+
+    def posted_rounds(self, limit=20):
+        """Most recent posted rounds (all of them with limit=None), oldest first —
+        served from the rounds_posted index."""
+        rows = self.rounds('WHERE include_ghin AND differential IS NOT NULL',
+                           order='date DESC, id DESC', limit=limit)
+        return rows[::-1]
+
+    def _write_round(self, c, r):
+        c.execute('INSERT OR REPLACE INTO rounds (id, date, course_id, include_ghin, differential, data) '
+                  'VALUES (?, ?, ?, ?, ?, ?)',
+                  (r['id'], r.get('date'), r.get('course_id'), bool(r.get('include_ghin')),
+                   r.get('differential'), json.dumps(r)))
+
+    def put_round(self, r):
+        with self.conn() as c:
+            self._write_round(c, r)
+
+    def put_rounds(self, rs):
+        with self.conn() as c:
+            for r in rs:
+                self._write_round(c, r)
+
+    def delete_round(self, round_id):
+        with self.conn() as c:
+            return c.execute('DELETE FROM rounds WHERE id = ?', (round_id,)).rowcount > 0
+
+    # ── matches (addressed by list position, like vd_matches.json) ────────
+    def matches(self):
+        return [json.loads(d) for (d,) in
+                self.conn().execute('SELECT data FROM matches ORDER BY seq')]
+
+    def _match_seq(self, c, idx):
+        row = c.execute('SELECT seq FROM matches ORDER BY seq LIMIT 1 OFFSET ?', (idx,)).fetchone()
+        return row[0] if row else None
+
+    def add_match(self, m):
+        with self.conn() as c:
+            c.execute('INSERT INTO matches (date, winner, data) VALUES (?, ?, ?)',
+                      (m.get('date'), m.get('winner'), json.dumps(m)))
+
+    def add_matches(self, ms):
+        with self.conn() as c:
+            c.executemany('INSERT INTO matches (date, winner, data) VALUES (?, ?, ?)',
+                          [(m.get('date'), m.get('winner'), json.dumps(m)) for m in ms])
+
+    def set_match(self, idx, m):
+        with self.conn() as c:
+            seq = self._match_seq(c, idx)
+            if seq is None:
+                return False
+            c.execute('UPDATE matches SET date = ?, winner = ?, data = ? WHERE seq = ?',
+                      (m.get('date'), m.get('winner'), json.dumps(m), seq))
+            return True
+
+    def delete_match(self, idx):
+        with self.conn() as c:
+            seq = self._match_seq(c, idx)
+            if seq is None:
+                return False
+            c.execute('DELETE FROM matches WHERE seq = ?', (seq,))
+            return True
+
+    # ── courses ────────────────────────────────────────────────────────────
+    def courses(self):
+        return [json.loads(d) for (d,) in
+                self.conn().execute('SELECT data FROM courses ORDER BY seq')]
+
+    # ── whole-table replace (import, JsonStore.put equivalents) ───────────
+    def replace_all(self, table, records):
+        with self.conn() as c:
+            c.execute(f'DELETE FROM {table}')
+            if table == 'rounds':
+                for r in records:
+                    self._write_round(c, r)
+            elif table == 'matches':
+                c.executemany('INSERT INTO matches (date, winner, data) VALUES (?, ?, ?)',
+                              [(m.get('date'), m.get('winner'), json.dumps(m)) for m in records])
+            else:
+                c.executemany('INSERT INTO courses (id, name, data) VALUES (?, ?, ?)',
+                              [(x.get('id'), x.get('name'), json.dumps(x)) for x in records])
+
+    def load_all(self, table):
+        return {'rounds': self.rounds, 'matches': self.matches, 'courses': self.courses}[table]()
+
+
+if __name__ == '__main__':
+    import server
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ''
+    db  = Database()
+    files = [('rounds', server.ROUNDS_FILE, 'id'), ('matches', server.MATCHES_FILE, None),
+             ('courses', server.COURSES_FILE, None)]
+    if cmd == 'import':
+        for table, path, key in files:
+            # JournaledStore replays any un-compacted .wal on top of the snapshot
+            store = server.JournaledStore(path, key) if table != 'courses' else server.JsonStore(path)
+            data = store.get()
+            db.replace_all(table, data)
+            print(f'{len(data):4d} {table} → {db.path}')
+    elif cmd == 'export':
+        for table, path, key in files:
+            data = db.load_all(table)
+            store = server.JournaledStore(path, key) if table != 'courses' else server.JsonStore(path)
+            store.put(data)
+            print(f'{len(data):4d} {table} → {path}')
+    else:
+        print(__doc__.strip())
+        sys.exit(1)
@@ -0,0 +1,76 @@
+"""VD match standings — running totals, 5-match SMA and win/loss/tie record.
+
+Kept up to date per match instead of being recomputed by every client.
+A standing is + when D leads and − when V leads; a `historical` match
+carries the running total it was recorded at, so it resets the total
+rather than adding to it.
+"""
+
+SMA_N = 5
+
+
+def signed_margin(m):
+    margin = m.get('margin') or 0
+    return margin if m.get('winner') == 'D' else -margin if m.get('winner') == 'V' else 0
+
+
+class Standings:
+    """Per-match running totals for the list in vd_matches.json.
+
+    Appending a match is O(1); editing or deleting match i recomputes the
+    rows from i onward, since every later total depends on it.
+    """
+    def __init__(self, matches=()):
+        self.version = None     # MATCHES.version this state reflects
+        self.rebuild(matches)
+
+    def rebuild(self, matches):
+        self.matches = []
+        self.rows    = []
+        self.record  = {'D': 0, 'V': 0, 'T': 0}
+        for m in matches:
+            self.append(m)
+
+    def append(self, m):
+        i    = len(self.rows)
+        prev = self.rows[-1]['standing'] if self.rows else 0
+        s    = signed_margin(m) if m.get('historical') else prev + signed_margin(m)
+        # the record counts which way the standing moved, as the history page always has
+        self.record['D' if s > prev else 'V' if s < prev else 'T'] += 1
+        window = [r['standing'] for r in self.rows[max(0, i - SMA_N + 1):]] + [s]
+        self.matches.append(m)
+        self.rows.append({
+            **{k: v for k, v in m.items() if k != 'hole_results'},
+            'idx': i, 'standing': s,
+            'sma5': sum(window) / SMA_N if len(window) == SMA_N else None,
+        })
+
+    def _recompute_from(self, idx, matches):
+        for r in self.rows[idx:]:
+            prev = self.rows[r['idx'] - 1]['standing'] if r['idx'] else 0
+            s = r['standing']
+            self.record['D' if s > prev else 'V' if s < prev else 'T'] -= 1
+        del self.rows[idx:]
+        del self.matches[idx:]
+        for m in matches:
+            self.append(m)
+
+    def apply(self, op):
+        """Mirror one MATCHES journal op (see server.apply_op)."""
+        if op['op'] == 'add':
+            self.append(op['rec'])
+            return
+        idx = op['at']
+        if not 0 <= idx < len(self.matches):
+            return
+        tail = self.matches[idx + 1:]
+        self._recompute_from(idx, ([op['rec']] if op['op'] == 'set' else []) + tail)
+
+    def snapshot(self):
+        return {
+            'matches':   list(self.rows),
+            'standing':  self.rows[-1]['standing'] if self.rows else 0,
+            'n_matches': len(self.rows),
+            'record':    {'d_wins': self.record['D'], 'v_wins': self.record['V'],
+                          'ties': self.record['T']},
+        }
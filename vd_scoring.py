@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+VD hole-scoring rules, ported from the PWA's inline JavaScript
+(calcHole, matchScore, margin, getHonor, getHonorNext, computeStrokesForNine)
+so stored rounds can be re-scored and audited on the server.
+
+Audit every stored VD round against vd_matches.json (server stopped):
+    python3 vd_scoring.py          # report mismatches
+    python3 vd_scoring.py --fix    # also rewrite winner/margin/honor_next
+"""
+import sys
+
+# Governors Club nines — hole numbers and handicaps, same as GOV_NINES in the PWA
+GOV_NINES = {
+    'Lakes':     {1: 3, 2: 4, 3: 9, 4: 7, 5: 2, 6: 6, 7: 8, 8: 1, 9: 5},
+    'Foothills': {10: 2, 11: 1, 12: 6, 13: 8, 14: 7, 15: 9, 16: 3, 17: 5, 18: 4},
+    'Mountain':  {19: 9, 20: 2, 21: 8, 22: 6, 23: 4, 24: 7, 25: 5, 26: 1, 27: 3},
+}
+STROKE_EVERY = 5   # one stroke per 5 points of margin at the start of a nine
+CAP_OVER_PAR = 2   # net scores are capped at double bogey
+
+
+def calc_hole(v_gross, d_gross, v_stroke, d_stroke):
+    """Net scores for one hole (calcHole)."""
+    return v_gross - (1 if v_stroke else 0), d_gross - (1 if d_stroke else 0)
+
+
+def capped(par, v_net, d_net):
+    """(vC, dC, halved): nets capped at double bogey; halved if both hit the cap."""
+    cap = par + CAP_OVER_PAR
+    v_c, d_c = min(v_net, cap), min(d_net, cap)
+    return v_c, d_c, v_c >= cap and d_c >= cap
+
+
+def match_score(results):
+    """Summed capped nets over the VD holes, skipping holes both players capped (matchScore)."""
+    v_tot = d_tot = 0
+    for r in results:
+        vd = r.get('vd')
+        if not vd:
+            continue
+        v_c, d_c, halved = capped(r['par'], vd['vNet'], vd['dNet'])
+        if not halved:
+            v_tot += v_c
+            d_tot += d_c
+    return v_tot, d_tot
+
+
+def margin(results, start_offset=0):
+    """+ = V ahead (margin); start_offset > 0 is a V head start."""
+    v_tot, d_tot = match_score(results)
+    return (d_tot - v_tot) + start_offset
+
+
+def honor(results, initial_honor='D'):
+    """Who tees off next within the round: the low gross on the last decided hole (getHonor)."""
+    for r in reversed(results):
+        vd = r.get('vd')
+        if not vd:
+            continue
+        if vd['vGross'] < vd['dGross']:
+            return 'V'
+        if vd['dGross'] < vd['vGross']:
+            return 'D'
+    return initial_honor
+
+
+def honor_next(results, initial_honor='D'):
+    """Honor carried to the next match (getHonorNext) — the other side of the last decided hole."""
+    for r in reversed(results):
+        vd = r.get('vd')
+        if not vd:
+            continue
+        if vd['vGross'] < vd['dGross']:
+            return 'D'
+        if vd['dGross'] < vd['vGross']:
+            return 'V'
+    return 'D' if initial_honor == 'V' else 'V'
+
+
+def allocate_strokes(nine, m):
+    """{hole_number: 'v'|'d'} for one nine given the margin at its first tee (computeStrokesForNine).
+
+    The trailing player gets floor(|m| / 5) strokes on the nine's hardest holes.
+    """
+    strokes = abs(m) // STROKE_EVERY
+    if not strokes:
+        return {}
+    who = 'd' if m > 0 else 'v'
+    hardest = sorted(GOV_NINES[nine], key=GOV_NINES[nine].get)[:strokes]
+    return {h: who for h in hardest}
+
+
+def replay(hole_results, nines=(), start_offset=0, initial_honor=None):
+    """Re-score a round hole by hole from gross scores alone.
+
+    Strokes are only given on Governors Club rounds (`nines` names the
+    nines played, in order). Returns the recomputed per-hole vd dicts, the
+    final margin/winner/honor_next and the holes whose stored vd differs.
+    """
+    holes = [r for r in hole_results if r.get('vd')]
+    if initial_honor is None:
+        initial_honor = holes[0]['vd'].get('honor', 'D') if holes else 'D'
+    gov = bool(nines) and all(n in GOV_NINES for n in nines)
+    starts = {}
+    if gov:
+        i = 0
+        for n in nines:
+            starts[i] = n
+            i += len(GOV_NINES[n])
+
+    out, stroke_map, diffs = [], {}, []
+    for i, r in enumerate(holes):
+        if i in starts:
+            stroke_map.update(allocate_strokes(starts[i], margin(out, start_offset)))
+        vd = r['vd']
+        who = stroke_map.get(r.get('holeNumber'))
+        v_net, d_net = calc_hole(vd['vGross'], vd['dGross'], who == 'v', who == 'd')
+        new = {'vGross': vd['vGross'], 'dGross': vd['dGross'],
+               'vStroke': who == 'v', 'dStroke': who == 'd',
+               'vNet': v_net, 'dNet': d_net, 'honor': honor(out, initial_honor)}
+        if any(vd.get(k) != v for k, v in new.items()):
+            diffs.append(r.get('holeNumber'))
+        out.append({**r, 'vd': new})
+
+    m = margin(out, start_offset)
+    return {
+        'holes': out, 'margin': abs(m), 'winner': 'V' if m > 0 else 'D' if m < 0 else 'T',
+        'honor_next': honor_next(out, initial_honor), 'strokes': stroke_map,
+        'hole_diffs': diffs,
+    }
+
+
+def infer_start_offset(round_):
+    """start_offset for rounds saved before it was recorded: the final signed
+    margin minus what the stored hole nets account for."""
+    vm = round_['vd_match']
+    if 'start_offset' in vm:
+        return vm['start_offset'], False
+    sign = 1 if vm.get('winner') == 'V' else -1 if vm.get('winner') == 'D' else 0
+    return sign * (vm.get('margin') or 0) - margin(round_['hole_results']), True
+
+
+def audit(rounds, matches):
+    """Re-score every VD round in one pass and pair it with its vd_matches.json entry.
+
+    Pairing is by date and nines among non-historical matches, in order.
+    Returns one dict per scored round with the match index (or None),
+    the recomputed result and the fields that disagree.
+    """
+    pending = {}
+    for idx, m in enumerate(matches):
+        if not m.get('historical'):
+            pending.setdefault((m.get('date'), tuple(m.get('nines') or ())), []).append(idx)
+
+    report = []
+    for r in rounds:
+        vm = r.get('vd_match')
+        if not vm or not any(h.get('vd') for h in r.get('hole_results') or ()):
+            continue
+        offset, inferred = infer_start_offset(r)
+        res = replay(r['hole_results'], vm.get('nines') or (), offset, vm.get('initial_honor'))
+        slot = pending.get((vm.get('date'), tuple(vm.get('nines') or ())))
+        idx = slot.pop(0) if slot else None
+        stored = matches[idx] if idx is not None else vm
+        fields = [k for k in ('winner', 'margin', 'honor_next') if stored.get(k) != res[k]]
+        report.append({
+            'round_id': r['id'], 'date': r.get('date'), 'match_idx': idx,
+            'start_offset': offset, 'offset_inferred': inferred,
+            'winner': res['winner'], 'margin': res['margin'], 'honor_next': res['honor_next'],
+            'mismatched': fields, 'hole_diffs': res['hole_diffs'],
+        })
+    return report
+
+
+if __name__ == '__main__':
+    import server
+    fix = '--fix' in sys.argv[1:]
+    report = audit(server.load_rounds(), server.load_matches())
+    bad = [x for x in report if x['mismatched'] or x['hole_diffs'] or x['match_idx'] is None]
+    for x in bad:
+        where = f"match #{x['match_idx']}" if x['match_idx'] is not None else 'no stored match'
+        print(f"round {x['round_id']} {x['date']} ({where}): "
+              f"fields {x['mismatched'] or '-'}, holes {x['hole_diffs'] or '-'}")
+        if fix and x['match_idx'] is not None and x['mismatched']:
+            server.update_match(x['match_idx'], {k: x[k] for k in x['mismatched']})
+    if fix:
+        server.compact_all()
+    print(f'{len(report)} VD rounds scored, {len(bad)} with differences')